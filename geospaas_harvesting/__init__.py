@@ -7,16 +7,41 @@ import os.path
 import sys
 import yaml
 
+from . import utils
+
 DEFAULT_LOGGING_CONF_FILE = os.path.join(os.path.dirname(__file__), 'logging.yml')
 LOGGING_CONF_FILE = os.getenv('GEOSPAAS_HARVESTING_LOG_CONF_PATH', DEFAULT_LOGGING_CONF_FILE)
 
+
+def _read_logging_configuration(path):
+    """Read the logging configuration from a YAML file.
+    The parsed configuration is cached on disk and reused as long as
+    the file is not modified, which avoids parsing the YAML file each
+    time the package is imported.
+    """
+    stat = os.stat(path)
+    cache_path = utils.cache_file_path('logging', path)
+    configuration = utils.read_cache_file(cache_path, stat)
+    if configuration is not None:
+        return configuration
+
+    with open(path, 'rb') as stream:
+        # use the libyaml bindings when they are available
+        configuration = yaml.load(stream, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    utils.write_cache_file(cache_path, stat, configuration)
+    return configuration
+
+
 try:
-    with open(LOGGING_CONF_FILE, 'rb') as stream:
-        logging_configuration = yaml.safe_load(stream)  # pylint: disable=invalid-name
+    logging_configuration = _read_logging_configuration(LOGGING_CONF_FILE)  # pylint: disable=invalid-name
 except FileNotFoundError:  # pragma: no cover
     print(f"'{LOGGING_CONF_FILE}' does not exist, logging can't be configured.", file=sys.stderr)
     logging_configuration = None  # pylint: disable=invalid-name
 
-if logging_configuration:
+# dictConfig() resets the existing handlers, so make sure it only runs
+# once per interpreter even if this module is executed again (reload,
+# child processes which inherit the parent's logging configuration)
+if logging_configuration and not getattr(logging, '_geospaas_harvesting_configured', False):
     logging.config.dictConfig(logging_configuration)
     logging.captureWarnings(True)
+    logging._geospaas_harvesting_configured = True  # pylint: disable=protected-access
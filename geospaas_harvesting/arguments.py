@@ -1,14 +1,47 @@
 """This module defines classes used to parse and validate arguments.
 """
+import collections
+import functools
 import re
-from datetime import timezone
+from datetime import datetime, timezone
 
-import dateutil.parser
-import shapely.wkt
+
+class _Missing():
+    """Type of the sentinel used when no value or no default value is
+    specified
+    """
+
+    def __repr__(self):
+        return 'NoDefault'
+
+    def __reduce__(self):
+        # pickle by reference so that the identity of the sentinel is
+        # preserved in child processes
+        return '_MISSING'
+
+
+_MISSING = _Missing()
+# kept for backwards compatibility
+NoDefault = _MISSING
 
 
-class NoDefault:
-    """Special class used when no default value is specified"""
+# shapely and dateutil are only imported when they are actually needed
+# to keep the import of this module cheap
+@functools.lru_cache(maxsize=1)
+def _get_datetime_parser():
+    """Returns the function used to parse datetime strings"""
+    import dateutil.parser  # pylint: disable=import-outside-toplevel
+    return dateutil.parser.parse
+
+
+@functools.lru_cache(maxsize=1)
+def _get_wkt_loader():
+    """Returns the function used to parse WKT strings.
+    Shapely geometries are immutable, so the parsed geometries are
+    cached: the same locations are often used in many searches.
+    """
+    import shapely.wkt  # pylint: disable=import-outside-toplevel
+    return functools.lru_cache(maxsize=256)(shapely.wkt.loads)
 
 
 class ArgumentParser():
@@ -40,34 +73,35 @@ class ArgumentParser():
     def parse(self, parameters):
         """Makes sure the right arguments are passed and parses them.
         `parameters` should be a dictionary of parameters to be
-        validated.
+        validated. It is not modified.
         """
         parsed_parameters = {}
-        recursion_stack = list(self.arguments.values())
-        max_stack_size = 10000
+        found = set()
+        to_process = collections.deque(self.arguments.values())
 
         # Loop through the argument definitions and check that the
         # parameters match the definitions.
         # If an argument has children, they will be checked too
-        while recursion_stack and len(recursion_stack) <= max_stack_size:
+        while to_process:
             # if the name of the argument is found in the parameters,
-            # the value is parsed and adde to the final results.
-            argument = recursion_stack.pop()
-            if argument.name in parameters:
-                parsed_parameters[argument.name] = argument.parse(
-                    parameters.pop(argument.name))
-                # add the child arguments to the stack so that they are
+            # the value is parsed and added to the final results.
+            argument = to_process.popleft()
+            value = parameters.get(argument.name, _MISSING)
+            if value is not _MISSING:
+                found.add(argument.name)
+                parsed_parameters[argument.name] = argument.parse(value)
+                # add the child arguments to the queue so that they are
                 # processed
-                for child in argument.children:
-                    recursion_stack.append(child)
+                to_process.extend(argument.children)
             elif argument.required:
                 raise ValueError(f"Argument {argument.name} not provided")
-            else:
-                if argument.default is not NoDefault:
-                    parsed_parameters[argument.name] = argument.default
+            elif argument.default is not _MISSING:
+                parsed_parameters[argument.name] = argument.default
 
-        if self.strict and parameters:
-            raise ValueError(f"Unknown argument(s) {parameters}")
+        if self.strict:
+            unknown = {name: parameters[name] for name in parameters.keys() - found}
+            if unknown:
+                raise ValueError(f"Unknown argument(s) {unknown}")
 
         return parsed_parameters
 
@@ -79,29 +113,37 @@ class Argument():
     listed as children. In that case, their 'parent' attribute is set
     """
     type = 'unknown'
+    __slots__ = ('name', 'required', 'default', 'description', 'parent', 'children')
 
     def __init__(self, name, **kwargs):
         self.name = name
         self.required = kwargs.get('required', False)
-        self.default = kwargs.get('default', NoDefault)
+        self.default = kwargs.get('default', _MISSING)
         self.description = kwargs.get('description', '')
         self.parent = None
-        self.children = []
+        # children are rarely added, but iterated over each time the
+        # argument is parsed
+        self.children = ()
 
     def __eq__(self, other):
-        return (
-            self.name == other.name and
-            self.required == other.required and
-            self.default == other.default and
-            self.description == other.description
-        )
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        return self._comparison_key() == other._comparison_key()
+
+    def _comparison_key(self):
+        """Returns a tuple of the attributes used to compare arguments.
+        Child classes which define extra attributes should extend it.
+        """
+        return (self.name, self.required, self.default, self.description)
 
     def __str__(self):
         return ', '.join(filter(None, (
             f"{self.name}",
             f"type={self.type}",
             'required' if self.required else 'not required',
-            f"default={self.default}" if self.default is not NoDefault else '',
+            f"default={self.default}" if self.default is not _MISSING else '',
             f"description={self.description}" if self.description else '',
         )))
 
@@ -112,7 +154,7 @@ class Argument():
     def add_child(self, child):
         """Add a child argument"""
         child._set_parent(self)
-        self.children.append(child)
+        self.children += (child,)
 
     def parse(self, value):
         """Return a properly formatted value for the argument.
@@ -124,6 +166,7 @@ class Argument():
 class AnyArgument(Argument):
     """Passthrough argument with no validation"""
     type = 'any type'
+    __slots__ = ()
 
     def parse(self, value):
         return value
@@ -132,6 +175,7 @@ class AnyArgument(Argument):
 class BooleanArgument(Argument):
     """Boolean argument. Should be an explicit boolean"""
     type = 'boolean'
+    __slots__ = ()
 
     def parse(self, value):
         if isinstance(value, bool):
@@ -145,15 +189,16 @@ class ChoiceArgument(Argument):
     of valid options
     """
     type = 'multiple choices'
+    __slots__ = ('valid_options',)
 
     def __init__(self, name, **kwargs):
         self.valid_options = kwargs.pop('valid_options', [])
         super().__init__(name, **kwargs)
-        if self.default is not NoDefault:
+        if self.default is not _MISSING:
             self.validate(self.default)
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.valid_options == other.valid_options
+    def _comparison_key(self):
+        return super()._comparison_key() + (self.valid_options,)
 
     def __str__(self):
         return super().__str__() + f", valid options={self.valid_options}"
@@ -173,11 +218,17 @@ class DatetimeArgument(Argument):
     it is set as UTC.
     """
     type = 'datetime'
+    __slots__ = ()
 
     def parse(self, value):
         if value is None:
             return None
-        _datetime = dateutil.parser.parse(value)
+        # fromisoformat() is much faster than dateutil and handles the
+        # most common formats
+        try:
+            _datetime = datetime.fromisoformat(value)
+        except ValueError:
+            _datetime = _get_datetime_parser()(value)
         if _datetime.tzinfo is None:
             _datetime = _datetime.replace(tzinfo=timezone.utc)
         return _datetime
@@ -186,24 +237,26 @@ class DatetimeArgument(Argument):
 class DictArgument(Argument):
     """Dictionary argument"""
     type = 'dictionary'
+    __slots__ = ('valid_keys',)
 
     def __init__(self, name, **kwargs):
-        self.valid_keys = set(kwargs.pop('valid_keys', []))
+        self.valid_keys = frozenset(kwargs.pop('valid_keys', ()))
         super().__init__(name, **kwargs)
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.valid_keys == other.valid_keys
+    def _comparison_key(self):
+        return super()._comparison_key() + (self.valid_keys,)
 
     def __str__(self):
         return (super().__str__() +
-                (f", valid keys={self.valid_keys}" if self.valid_keys else ''))
+                (f", valid keys={set(self.valid_keys)}" if self.valid_keys else ''))
 
     def parse(self, value):
         if not isinstance(value, dict):
             raise ValueError(f"{self.name} should be a dictionary")
-        keys = set(value.keys())
-        if self.valid_keys and not keys.issubset(self.valid_keys):
-            raise ValueError(f"Invalid keys {keys.difference(self.valid_keys)}")
+        if self.valid_keys:
+            invalid_keys = value.keys() - self.valid_keys
+            if invalid_keys:
+                raise ValueError(f"Invalid keys {invalid_keys}")
         return value
 
 
@@ -212,31 +265,55 @@ class IntegerArgument(Argument):
     comprised between a minimum and a maximum value
     """
     type = 'integer'
+    __slots__ = ('min_value', 'max_value', '_in_range')
 
     def __init__(self, name, **kwargs):
         min_value = kwargs.pop('min_value', None)
         max_value = kwargs.pop('max_value', None)
         self.min_value = int(min_value) if min_value is not None else min_value
         self.max_value = int(max_value) if max_value is not None else max_value
+        # pick the range check once instead of testing which bounds
+        # are defined each time a value is parsed
+        if self.min_value is None and self.max_value is None:
+            self._in_range = self._no_bounds
+        elif self.max_value is None:
+            self._in_range = self._check_min
+        elif self.min_value is None:
+            self._in_range = self._check_max
+        else:
+            self._in_range = self._check_min_max
         super().__init__(name, **kwargs)
 
-    def __eq__(self, other):
-        return (
-            super().__eq__(other) and
-            self.min_value == other.min_value and
-            self.max_value == other.max_value
-        )
+    def _comparison_key(self):
+        return super()._comparison_key() + (self.min_value, self.max_value)
 
     def __str__(self):
         return (super().__str__() +
                 (f", minimum value={self.min_value}" if self.min_value else '') +
                 (f", maximum value={self.max_value}" if self.max_value else ''))
 
+    @staticmethod
+    def _no_bounds(value):  # pylint: disable=unused-argument
+        """Range check used when no bounds are defined"""
+        return True
+
+    def _check_min(self, value):
+        """Range check used when only a minimum value is defined"""
+        return self.min_value <= value
+
+    def _check_max(self, value):
+        """Range check used when only a maximum value is defined"""
+        return value <= self.max_value
+
+    def _check_min_max(self, value):
+        """Range check used when both bounds are defined"""
+        return self.min_value <= value <= self.max_value
+
     def parse(self, value):
-        if not isinstance(value, int):
+        # booleans are a subclass of int but are not valid values
+        if type(value) is not int:  # pylint: disable=unidiomatic-typecheck
             raise ValueError(f"{self.name} should be an integer")
-        if (self.min_value is not None and value < self.min_value or
-                self.max_value is not None and value > self.max_value):
+        if not self._in_range(value):
             raise ValueError(
                 f"{value} outside of allowed range: [{self.min_value}, {self.max_value}]")
         return value
@@ -245,6 +322,7 @@ class IntegerArgument(Argument):
 class ListArgument(Argument):
     """Check that the value is a list"""
     type = 'list'
+    __slots__ = ()
 
     def parse(self, value):
         if not isinstance(value, list):
@@ -258,12 +336,19 @@ class PathArgument(ChoiceArgument):
     Subdirectories of the valid options are still valid.
     """
     type = 'path'
+    __slots__ = ('_valid_prefixes',)
     SEP = '/'
-    path_re = re.compile(rf'^\.{{,2}}({SEP}[^{SEP}]*)*{SEP}?$')
+    path_re = re.compile(rf'\.{{,2}}(?:{SEP}[^{SEP}]*)*{SEP}?', re.ASCII)
+
+    def __init__(self, name, **kwargs):
+        # str.startswith() accepts a tuple of prefixes and checks
+        # them all in one call
+        self._valid_prefixes = tuple(kwargs.get('valid_options', ()))
+        super().__init__(name, **kwargs)
 
     def is_path(self, path):
         """Returns True if the value is a valid path"""
-        return self.path_re.match(path)
+        return self.path_re.fullmatch(path) is not None
 
     def validate(self, value):
         # check path format
@@ -271,27 +356,22 @@ class PathArgument(ChoiceArgument):
             raise ValueError(f"{value} is not a valid path")
 
         # check valid options
-        if self.valid_options:
-            found = False
-            for valid_path in self.valid_options:
-                if value.startswith(valid_path):
-                    found = True
-                    break
-            if not found:
-                raise ValueError(
-                    f"{value} is not an accepted path :{self.valid_options}")
+        if self._valid_prefixes and not value.startswith(self._valid_prefixes):
+            raise ValueError(f"{value} is not an accepted path :{self.valid_options}")
 
 
 class StringArgument(Argument):
     """String argument with optional regex validation"""
     type = 'string'
+    __slots__ = ('regex', '_compiled_regex')
 
     def __init__(self, name, **kwargs):
         self.regex = kwargs.pop('regex', None)
+        self._compiled_regex = re.compile(self.regex) if self.regex is not None else None
         super().__init__(name, **kwargs)
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.regex == other.regex
+    def _comparison_key(self):
+        return super()._comparison_key() + (self.regex,)
 
     def __str__(self):
         return (super().__str__() +
@@ -300,7 +380,7 @@ class StringArgument(Argument):
     def parse(self, value):
         if not isinstance(value, str):
             raise ValueError(f"{self.name} should be a string")
-        if self.regex is not None and not re.match(self.regex, value):
+        if self._compiled_regex is not None and not self._compiled_regex.match(value):
             raise ValueError(f"{value} does not match the validation pattern {self.regex}")
         return value
 
@@ -308,13 +388,14 @@ class StringArgument(Argument):
 class WKTArgument(Argument):
     """Creates a shapely geometry object from a WKT string"""
     type = 'WKT string'
+    __slots__ = ('geometry_types',)
 
     def __init__(self, name, **kwargs):
         self.geometry_types = kwargs.pop('geometry_types', [])
         super().__init__(name, **kwargs)
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.geometry_types == other.geometry_types
+    def _comparison_key(self):
+        return super()._comparison_key() + (self.geometry_types,)
 
     def __str__(self):
         accepted_geometries = [g.__name__ for g in self.geometry_types]
@@ -322,7 +403,7 @@ class WKTArgument(Argument):
                 (f", accepted geometries={accepted_geometries}" if accepted_geometries else ''))
 
     def parse(self, value):
-        geometry = shapely.wkt.loads(value)
+        geometry = _get_wkt_loader()(value)
         geometry_type = type(geometry)
         if self.geometry_types is None or geometry_type in self.geometry_types:
             return geometry
@@ -5,6 +5,7 @@
 import argparse
 import concurrent.futures
 import logging
+import multiprocessing
 import os
 import signal
 from pathlib import Path
@@ -49,27 +50,41 @@ def refresh_vocabularies(config):
         logger.info('Finished updating vocabularies')
     # safety check in order to prevent harvesting process with an empty
     # list of parameters
-    elif Parameter.objects.count() < 1:
+    elif not Parameter.objects.exists():
         raise RuntimeError((
             "Parameters must be updated (with the 'update_vocabularies' command "
             "of django-geospaas) before the harvesting process"
         ))
 
 
+def save_search_results(search_results):
+    """Ingests the results of one search. Errors are logged instead of
+    being raised so that they don't interrupt the other ingestions.
+    This function is meant to be run in a child process.
+    """
+    try:
+        search_results.save()
+    except Exception:  # pylint: disable=broad-except
+        logger.error("An exception happened during harvesting process", exc_info=True)
+
+
 def save_results(searches_results):
-    """Ingests the results of each search in a separate process"""
-    with concurrent.futures.ProcessPoolExecutor(initializer=init_worker) as executor:
+    """Ingests the results of each search in a separate process.
+    The child processes are forked from a server process in which
+    Django is already set up, so they don't need to do it again and
+    don't inherit the parent's database connections.
+    """
+    searches_results = list(searches_results)
+    max_workers = os.cpu_count() or 1
+    chunk_size = max(1, len(searches_results) // (4 * max_workers))
+    mp_context = multiprocessing.get_context('forkserver')
+    mp_context.set_forkserver_preload(['geospaas_harvesting.cli'])
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers,
+                                                mp_context=mp_context,
+                                                initializer=init_worker) as executor:
         try:
-            futures = []
-            for search_results in searches_results:
-                futures.append(executor.submit(search_results.save))
-
-            for future in concurrent.futures.as_completed(futures):
-                exception = future.exception()
-                if exception:
-                    logger.error(
-                        "An exception happened during harvesting process",
-                        exc_info=exception)
+            for _ in executor.map(save_search_results, searches_results, chunksize=chunk_size):
+                pass
         except KeyboardInterrupt:
             executor.shutdown(wait=False)
             raise
@@ -1,30 +1,80 @@
 """Configuration management"""
+import collections
+import collections.abc
+import concurrent.futures
+import copy
+import importlib
 import logging
+import os
+import os.path
+import sys
 
-import geospaas_harvesting.providers.aviso as providers_aviso
 import geospaas_harvesting.providers.base as providers_base
-import geospaas_harvesting.providers.ceda as providers_ceda
-import geospaas_harvesting.providers.cmems as providers_cmems
-import geospaas_harvesting.providers.copernicus_scihub as providers_copernicus_scihub
-import geospaas_harvesting.providers.earthdata_cmr as providers_earthdata_cmr
-import geospaas_harvesting.providers.erddap as providers_erddap
-import geospaas_harvesting.providers.ftp as providers_ftp
-import geospaas_harvesting.providers.http as providers_http
-import geospaas_harvesting.providers.jaxa as providers_jaxa
-import geospaas_harvesting.providers.local as providers_local
-import geospaas_harvesting.providers.metno as providers_metno
-import geospaas_harvesting.providers.noaa as providers_noaa
-import geospaas_harvesting.providers.podaac as providers_podaac
-import geospaas_harvesting.providers.resto as providers_resto
 from .arguments import ArgumentParser, BooleanArgument, DictArgument, ListArgument
-from .utils import read_yaml_file
+from .utils import (cache_file_path, read_cache_file, read_raw_yaml_file,
+                    resolve_env_tags, write_cache_file)
 
 
 logger = logging.getLogger(__name__)
 
+YAML_CACHE_SIZE = 100
+_yaml_cache = collections.OrderedDict()
+
+
+def _load_yaml_or_json_cache(config_path):
+    """Reads a YAML configuration file. The parsed contents are stored
+    in a JSON file in the cache directory, which is used instead of the
+    YAML file as long as the YAML file is not modified.
+    The !ENV tags are stored as is in the JSON file, so that no
+    secrets are written to disk, and resolved after loading.
+    """
+    config_path = str(config_path)
+    stat = os.stat(config_path)
+    cache_path = cache_file_path('config', config_path)
+
+    data = read_cache_file(cache_path, stat)
+    if data is None:
+        data = read_raw_yaml_file(config_path)
+        write_cache_file(cache_path, stat, data)
+    return resolve_env_tags(data)
+
+
+def read_yaml_file_cached(config_path):
+    """Reads a YAML file, or gets its contents from a cache if the
+    file has already been read and was not modified since.
+    A copy of the contents is returned so that it can be safely
+    modified by the caller.
+    """
+    stat = os.stat(config_path)
+    key = (os.path.abspath(config_path), stat.st_mtime_ns, stat.st_size)
+    try:
+        data = _yaml_cache[key]
+    except KeyError:
+        data = _load_yaml_or_json_cache(config_path)
+        _yaml_cache[key] = data
+        if len(_yaml_cache) > YAML_CACHE_SIZE:
+            _yaml_cache.popitem(last=False)
+    else:
+        _yaml_cache.move_to_end(key)
+    return copy.deepcopy(data)
+
+
+def _freeze(value):
+    """Returns a hashable equivalent of a value made of dictionaries,
+    lists and hashable objects. Raises a TypeError if the value
+    contains other unhashable objects
+    """
+    if isinstance(value, dict):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    hash(value)
+    return value
+
 
 class Configuration():
     """Base class for configuration objects"""
+    __slots__ = ()
 
     def _parse_config(self, config_dict):
         """Parse a config dictionary and set the keys as properties of
@@ -43,7 +93,7 @@ class Configuration():
     @classmethod
     def from_file(cls, config_path):
         """Creates a configuration object from a YAML file"""
-        return cls.from_dict(read_yaml_file(config_path))
+        return cls.from_dict(read_yaml_file_cached(config_path))
 
 
 class ProvidersArgument(DictArgument):
@@ -57,84 +107,160 @@ class ProvidersArgument(DictArgument):
             'password': 'pass123'
     }
     """
-    provider_types = {
-        'aviso': providers_aviso.AVISOProvider,
-        'ceda': providers_ceda.CEDAProvider,
-        'cmems': providers_cmems.CMEMSProvider,
-        'copernicus_scihub': providers_copernicus_scihub.CopernicusScihubProvider,
-        'earthdata_cmr': providers_earthdata_cmr.EarthDataCMRProvider,
-        'ftp': providers_ftp.FTPProvider,
-        'gportal_ftp': providers_jaxa.GPortalProvider,
-        'http': providers_http.HTTPProvider,
-        'metno': providers_metno.METNOProvider,
-        'nansat': providers_local.NansatProvider,
-        'netcdf': providers_local.NetCDFProvider,
-        'noaa': providers_noaa.NOAAProvider,
-        'podaac': providers_podaac.PODAACProvider,
-        'resto': providers_resto.RestoProvider,
-        'tabledap': providers_erddap.ERDDAPTableProvider,
+    # modules in which the built-in providers are defined. They are only
+    # imported when a provider of the corresponding type is needed
+    provider_modules = {
+        'aviso': 'geospaas_harvesting.providers.aviso',
+        'ceda': 'geospaas_harvesting.providers.ceda',
+        'cmems': 'geospaas_harvesting.providers.cmems',
+        'copernicus_scihub': 'geospaas_harvesting.providers.copernicus_scihub',
+        'earthdata_cmr': 'geospaas_harvesting.providers.earthdata_cmr',
+        'ftp': 'geospaas_harvesting.providers.ftp',
+        'gportal_ftp': 'geospaas_harvesting.providers.jaxa',
+        'http': 'geospaas_harvesting.providers.http',
+        'metno': 'geospaas_harvesting.providers.metno',
+        'nansat': 'geospaas_harvesting.providers.local',
+        'netcdf': 'geospaas_harvesting.providers.local',
+        'noaa': 'geospaas_harvesting.providers.noaa',
+        'podaac': 'geospaas_harvesting.providers.podaac',
+        'resto': 'geospaas_harvesting.providers.resto',
+        'tabledap': 'geospaas_harvesting.providers.erddap',
     }
 
+    @classmethod
+    def _find_provider(cls, provider_type):
+        """Returns the provider class for the given type. The module
+        containing the provider is imported if necessary, which
+        registers the provider class.
+        """
+        if provider_type in cls.provider_modules:
+            importlib.import_module(cls.provider_modules[provider_type])
+        return providers_base.Provider.get_provider_class(provider_type)
+
+    @classmethod
+    def _import_provider_modules(cls, provider_types):
+        """Imports the modules of the given provider types in separate
+        threads. Executing the body of a module holds the GIL, and the
+        imports of modules which share dependencies wait for each other
+        on the import locks, so what runs in parallel is mostly the
+        I/O: finding, reading and loading the source, bytecode and
+        extension files.
+        Import errors are logged and ignored here: the failed modules
+        are not added to sys.modules, so the errors are raised again
+        when the provider classes are looked up. Other errors are
+        raised.
+        """
+        module_names = {
+            cls.provider_modules[provider_type]
+            for provider_type in provider_types
+            if provider_type in cls.provider_modules
+        } - sys.modules.keys()
+        if len(module_names) > 1:
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=min(8, len(module_names))) as executor:
+                futures = {
+                    executor.submit(importlib.import_module, module_name): module_name
+                    for module_name in module_names
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        future.result()
+                    except ImportError as error:
+                        logger.debug("Could not import '%s': %s", futures[future], error)
+
     def parse(self, value):
         """Go through the list of provider settings and create the
         providers
         """
         _providers = {}
         providers_dict = super().parse(value)
+        self._import_provider_modules(
+            provider_settings.get('type') for provider_settings in providers_dict.values())
         for provider_name, provider_settings in providers_dict.items():
+            # work on a copy to leave the configuration untouched
+            provider_settings = provider_settings.copy()
             try:
-                _providers[provider_name] = (
-                    self.provider_types[provider_settings['type']](
-                        name=provider_name,
-                        **provider_settings,
-                    ))
+                provider_type = provider_settings.pop('type')
+            except KeyError:
+                logger.error("Missing setting for provider '%s': type", provider_name)
+                continue
+            try:
+                provider_class = self._find_provider(provider_type)
+            except ValueError as error:
+                logger.error("Could not create provider '%s': %s", provider_name, error)
+                continue
+            try:
+                _providers[provider_name] = provider_class(name=provider_name, **provider_settings)
             except KeyError as error:
-                logger.error('Missing setting for provider: %s', error.args[0])
+                logger.error("Missing setting for provider '%s': %s",
+                             provider_name, error.args[0])
         return _providers
 
 
 class ProvidersConfiguration(Configuration):
     """Configuration manager for providers"""
+    __slots__ = ('update_vocabularies', 'update_pythesint', 'pythesint_versions', 'providers')
 
-    def __init__(self):
-        self.config_arguments_parser = ArgumentParser([
-            BooleanArgument('update_vocabularies', default=True),
-            BooleanArgument('update_pythesint', default=True),
-            DictArgument('pythesint_versions', default=None),
-            ProvidersArgument('providers', required=True)
-        ])
+    # the arguments do not depend on the instance, so the parser is
+    # shared by all ProvidersConfiguration objects
+    config_arguments_parser = ArgumentParser([
+        BooleanArgument('update_vocabularies', default=True),
+        BooleanArgument('update_pythesint', default=True),
+        DictArgument('pythesint_versions', default=None),
+        ProvidersArgument('providers', required=True)
+    ])
 
 
 class SearchConfiguration(Configuration):
     """Configuration manager used to parse search parameters"""
+    __slots__ = ('providers', 'common', 'searches')
+
+    config_arguments_parser = ArgumentParser([
+        DictArgument(
+            'common', argument_parser=providers_base.Provider.search_parameters_parser),
+        ListArgument('searches')
+    ])
 
     def __init__(self):
         self.providers = None
-        common_argument_parser = providers_base.Provider().search_parameters_parser
-        self.config_arguments_parser = ArgumentParser([
-            DictArgument(
-                'common', argument_parser=common_argument_parser),
-            ListArgument('searches')
-        ])
 
     def with_providers(self, providers):
         """Adds a dict of providers to the current object.
         Needs to be called before the create_provider_searches() method
         """
-        if isinstance(providers, dict):
+        if isinstance(providers, collections.abc.Mapping):
             self.providers = providers
         else:
-            raise ValueError("Need a dictionary")
+            raise ValueError("Need a mapping")
         return self
 
     def create_provider_searches(self):
         """Creates a SearchResults object for each of the provider
-        specific searches
+        specific searches. A search which is identical to a previous
+        one, once merged with the common parameters, is dropped with a
+        warning: it would return the same datasets, which would be
+        crawled and ingested twice. So the returned list can be shorter
+        than the list of configured searches.
         """
+        providers = self.providers
+        common = self.common  # pylint: disable=no-member
         searches = []
+        # identical searches are only run once
+        seen = set()
         for provider_search in self.searches:  # pylint: disable=no-member
-            provider_name = provider_search.pop('provider_name')
-            search_terms = self.common.copy()  # pylint: disable=no-member
-            search_terms.update(provider_search)
-            searches.append(self.providers[provider_name].search(**search_terms))
+            # self.searches is not modified so that this method can be
+            # called several times
+            search_terms = {**common, **provider_search}
+            provider_name = search_terms.pop('provider_name')
+            try:
+                key = (provider_name, _freeze(search_terms))
+            except TypeError:
+                key = None
+            if key is not None:
+                if key in seen:
+                    logger.warning("Skipping duplicate search for provider '%s': %s",
+                                   provider_name, search_terms)
+                    continue
+                seen.add(key)
+            searches.append(providers[provider_name].search(**search_terms))
         return searches
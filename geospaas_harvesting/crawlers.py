@@ -3,16 +3,18 @@ A set of crawlers used to explore data provider interfaces and get resources URL
 should inherit from the Crawler class and implement the abstract methods defined in Crawler.
 """
 import calendar
+import collections
 import concurrent.futures
 import ftplib
 import functools
-import io
 import logging
 import os
 import os.path
 import pickle
 import queue
+import random
 import re
+import sys
 import threading
 import time
 import xml.etree.ElementTree as ET
@@ -22,6 +24,11 @@ from urllib.parse import urljoin, urlparse
 
 import requests
 import shapely.geometry
+import urllib3
+try:
+    import lxml.etree
+except ImportError:  # pragma: no cover
+    lxml = None
 
 import geospaas_harvesting.utils as utils
 import geospaas.catalog.managers as catalog_managers
@@ -42,6 +49,8 @@ class DatasetInfo():
     """Class used to store dataset information coming from crawled repositories
     url is a string, metadata is a dict
     """
+    __slots__ = ('url', 'metadata')
+
     def __init__(self, url, metadata=None):
         self.url = url
         self.metadata = metadata
@@ -52,11 +61,28 @@ class DatasetInfo():
     def __eq__(self, other):
         return self.url == other.url and self.metadata == other.metadata
 
+    def __hash__(self):
+        return hash(self.url)
+
+    def __getstate__(self):
+        return {'url': self.url, 'metadata': self.metadata}
+
+    def __setstate__(self, state):
+        """Also used to load the objects pickled before __slots__ were
+        added, for example in recovery files
+        """
+        self.url = state['url']
+        self.metadata = state.get('metadata')
+
 
 class Crawler():
     """Base Crawler class"""
 
     logger = logging.getLogger(__name__ + '.Crawler')
+    # (connect, read) timeouts in seconds, used unless the request
+    # parameters specify another one
+    REQUEST_TIMEOUT = (10, 120)
+    _session = None
 
     def __init__(self, max_threads=1):
         self._metadata_handler = MetadataHandler(GeoSPaaSMetadataNormalizer)
@@ -79,14 +105,31 @@ class Crawler():
         """
         raise NotImplementedError()
 
+    def _get_session(self):
+        """Returns the HTTP session used by the crawler, creating it on
+        first use. The session keeps the connections to the servers
+        open, so that the crawler's threads do not need to open a new
+        connection for each request.
+        """
+        if self._session is None:
+            session = utils.TrustDomainSession()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.max_threads, pool_maxsize=self.max_threads * 2)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
     def _http_get(self, url, request_parameters=None, max_tries=5, wait_time=5):
         """Sends an HTTP GET request, retry in case of failure"""
         self.logger.debug("Getting page: '%s'", url)
 
+        request_parameters = {'timeout': self.REQUEST_TIMEOUT, **(request_parameters or {})}
         last_error = None
         for try_index in range(max_tries):
             try:
-                response = utils.http_request('GET', url, **request_parameters or {})
+                response = utils.http_request('GET', url, session=self._get_session(),
+                                              **request_parameters)
                 response.raise_for_status()
                 return response
             except (requests.ConnectionError, requests.HTTPError, requests.Timeout) as error:
@@ -98,10 +141,27 @@ class Crawler():
                     last_error = error
                     self.logger.warning('Error while sending request to %s, %d retries left',
                                         url, max_tries - try_index - 1, exc_info=True)
-            time.sleep(wait_time)
+            time.sleep(self._get_retry_wait_time(last_error, wait_time))
             wait_time *= 2
         raise RuntimeError(f"Max retries reached trying to get {url}") from last_error
 
+    @staticmethod
+    def _get_retry_wait_time(error, wait_time):
+        """Returns the number of seconds to wait before retrying a
+        request which failed with `error`. If the server sent a
+        Retry-After header, it is honored. Otherwise a random jitter
+        of up to 10% is added to `wait_time` so that the threads which
+        failed at the same time do not all retry at the same time.
+        """
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if isinstance(retry_after, str):
+            try:
+                return urllib3.util.Retry().parse_retry_after(retry_after)
+            except urllib3.exceptions.InvalidHeader:
+                pass
+        return wait_time + random.uniform(0, wait_time / 10)
+
     # --------- get metadata ---------
     def get_normalized_attributes(self, dataset_info, **kwargs):
         """
@@ -124,11 +184,14 @@ class CrawlerIterator():
     """
     logger = logging.getLogger(__name__ + '.CrawlerIterator')
     QUEUE_SIZE = 500
+    BATCH_SIZE = 64  # number of results passed through the queue at once
     FAILED_INGESTIONS_PATH = os.getenv(
         'GEOSPAAS_FAILED_INGESTIONS_DIR',
         os.path.join('/', 'var', 'run', 'geospaas'))
     MAX_FAILED = 500000  # max number of failed objects per recovery file
     RECOVERY_SUFFIX = 'failed_ingestions.pickle'
+    PICKLE_BUFFER_SIZE = 1 << 20
+    IN_FLIGHT_PER_THREAD = 4  # max number of submitted datasets per normalizing thread
 
     def __init__(self, crawler, max_threads=1):
         """Initializes the iterator and creates a managing thread which
@@ -137,8 +200,17 @@ class CrawlerIterator():
         self.crawler = crawler
         self.max_threads = max_threads
 
-        self._results = queue.Queue(self.QUEUE_SIZE)
+        # the results are passed through the queue in batches, so that
+        # the queue's lock is not acquired for each result
+        self._results = queue.Queue(max(1, self.QUEUE_SIZE // self.BATCH_SIZE))
         self._failed = queue.Queue(self.QUEUE_SIZE)
+        self._next_results = collections.deque()
+        self._batch = []
+        self._batch_lock = threading.Lock()
+        # limits the number of datasets submitted to the normalizing
+        # threads, so that the crawler does not get too far ahead
+        self._in_flight = threading.BoundedSemaphore(self.max_threads * self.IN_FLIGHT_PER_THREAD)
+        self._pending = set()
 
         self.main_thread = threading.current_thread()
         self.manager_thread = threading.Thread(target=self._start_normalizing, daemon=True)
@@ -155,19 +227,47 @@ class CrawlerIterator():
         return self
 
     def __next__(self):
-        """Gets the next result from the _results queue"""
-        next_result = self._results.get()
-        if next_result is Stop:
-            raise StopIteration()
-        else:
-            return next_result
+        """Gets the next result, getting a new batch from the _results
+        queue when necessary
+        """
+        if not self._next_results:
+            batch = self._results.get()
+            if batch is Stop:
+                raise StopIteration()
+            self._next_results.extend(batch)
+        return self._next_results.popleft()
+
+    def _put_result(self, result):
+        """Adds a result to the current batch, and puts the batch in
+        the _results queue when it is full
+        """
+        with self._batch_lock:
+            self._batch.append(result)
+            if len(self._batch) >= self.BATCH_SIZE:
+                self._put_batch()
+
+    def _flush_batch(self):
+        """Puts the results accumulated in the current batch in the
+        _results queue, even if the batch is not full
+        """
+        with self._batch_lock:
+            if self._batch:
+                self._put_batch()
+
+    def _put_batch(self):
+        """Puts the current batch in the _results queue and starts a
+        new one. Must be called with the batch lock held
+        """
+        self._results.put(self._batch)
+        self._batch = []
 
     def _pickle_list_elements(self, list_to_pickle, pickle_path):
-        """Pickle all the elements in the list, then empty it"""
+        """Pickle the list in one go, then empty it. Each call appends
+        one pickled list to the file.
+        """
         self.logger.info("Dumping items to %s", pickle_path)
-        with open(pickle_path, 'ab') as pickle_file:
-            for element_to_pickle in list_to_pickle:
-                pickle.dump(element_to_pickle, pickle_file)
+        with open(pickle_path, 'ab', buffering=self.PICKLE_BUFFER_SIZE) as pickle_file:
+            pickle.dump(list_to_pickle, pickle_file, protocol=pickle.HIGHEST_PROTOCOL)
         list_to_pickle.clear()
 
     def _start_normalizing(self, **kwargs):
@@ -185,33 +285,47 @@ class CrawlerIterator():
             with concurrent.futures.ThreadPoolExecutor(
                     max_workers=self.max_threads,
                     thread_name_prefix=self.__class__.__name__) as executor:
-                futures = []
                 for dataset_info in self.crawler.crawl():
-                    futures.append(executor.submit(
+                    self._in_flight.acquire()  # pylint: disable=consider-using-with
+                    future = executor.submit(
                         self._thread_get_normalized_attributes,
                         dataset_info,
                         **kwargs
-                    ))
+                    )
+                    self._pending.add(future)
+                    future.add_done_callback(self._normalizing_done)
         except KeyboardInterrupt:
             self.logger.info('Normalizing thread received stopping signal')
-            for future in reversed(futures):
+            for future in self._pending.copy():
                 future.cancel()
             self.logger.info(
                 'Cancelled future normalizing threads')
         finally:
             self.logger.debug("Normalizing threads are done")
+            self._flush_batch()
             self._results.put(Stop)
             self.logger.debug('Stopping failed queue watcher thread')
             self._failed.put(Stop)
             failed_queue_thread.join()
 
-            # raise exceptions from threads
-            for future in concurrent.futures.as_completed(futures):
-                exception = future.exception()
-                if exception:
-                    self.logger.error(
-                        "Exception happened during thread",
-                        exc_info=exception)
+    def _normalizing_done(self, future):
+        """Called when a normalizing future is done: frees its slot
+        and logs the exceptions raised in the thread.
+        Results are only accumulated in batches while the normalizing
+        threads have more work waiting. Otherwise the crawler is the
+        bottleneck, and the results are handed over without waiting
+        for the batch to be full.
+        """
+        self._pending.discard(future)
+        self._in_flight.release()
+        if len(self._pending) <= self.max_threads:
+            self._flush_batch()
+        if not future.cancelled():
+            exception = future.exception()
+            if exception:
+                self.logger.error(
+                    "Exception happened during thread",
+                    exc_info=exception)
 
     def _thread_get_normalized_attributes(self, dataset_info, **kwargs):
         """
@@ -231,7 +345,7 @@ class CrawlerIterator():
             self._failed.put((dataset_info, error), block=True)
         else:
             dataset_info.metadata = normalized_attributes
-            self._results.put(dataset_info)
+            self._put_result(dataset_info)
 
     def _thread_manage_failed_normalizing(self):
         """Watches the `_failed` queue and put the incoming failed
@@ -301,6 +415,12 @@ class LinkExtractor(HTMLParser):
 class DirectoryCrawler(Crawler):
     """Parent class for crawlers used on repositories which expose a directory-like structure"""
     EXCLUDE = None
+    # max number of folders processed at the same time on a host
+    PER_HOST_CONCURRENCY = 8
+
+    _seen_lock = threading.Lock()
+    _host_semaphores = {}
+    _host_semaphores_lock = threading.Lock()
 
     YEAR_PATTERN = r'y?(?P<year>\d{4})'
     MONTH_PATTERN = r'm?(?P<month>1[0-2]|0[1-9])'
@@ -312,6 +432,8 @@ class DirectoryCrawler(Crawler):
     DAY_OF_MONTH_MATCHER = re.compile(
         f'^.*/{YEAR_PATTERN}/?{MONTH_PATTERN}/?{DAY_OF_MONTH_PATTERN}(/.*)?$')
     DAY_OF_YEAR_MATCHER = re.compile(f'^.*/{YEAR_PATTERN}/{DAY_OF_YEAR_PATTERN}(/.*)?$')
+    # all the matchers above need this to be found in the path
+    YEAR_FINDER = re.compile(f'/{YEAR_PATTERN}')
 
     def __init__(self, root_url, time_range=(None, None), include=None,
                  username=None, password=None, max_threads=1):
@@ -324,6 +446,7 @@ class DirectoryCrawler(Crawler):
         """
         super().__init__(max_threads)
         self.root_url = urlparse(root_url)
+        self._base_url = f"{self.root_url.scheme}://{self.root_url.netloc}"
         self.time_range = time_range
         self.include = re.compile(include) if include else None
         self.username = username
@@ -349,7 +472,24 @@ class DirectoryCrawler(Crawler):
     @property
     def base_url(self):
         """Get the root URL without the path"""
-        return f"{self.root_url.scheme}://{self.root_url.netloc}"
+        return self._base_url
+
+    @property
+    def time_range(self):
+        """2-tuple of datetime.datetime objects defining the time range
+        of the datasets returned by the crawler
+        """
+        return self._time_range
+
+    @time_range.setter
+    def time_range(self, value):
+        self._time_range = value
+        # the limits are also stored as timestamps for the checks done
+        # on each folder. Naive datetimes are considered to be in UTC.
+        self._time_range_timestamps = tuple(
+            (limit if limit.tzinfo else limit.replace(tzinfo=timezone.utc)).timestamp()
+            if limit else default
+            for limit, default in zip(value, (float('-inf'), float('inf'))))
 
     # ------------- crawl ------------
     def set_initial_state(self):
@@ -358,11 +498,18 @@ class DirectoryCrawler(Crawler):
         will be returned by the crawler.
         The `_to_process` attribute contains URLs to pages which
         need to be searched for resources.
+        The `_results_seen` and `_to_process_seen` sets contain the
+        URLs and paths which have already been added to these lists.
         """
         self._results = []
         self._to_process = [self.root_url.path.rstrip('/')]
+        self._results_seen = set()
+        self._to_process_seen = set(self._to_process)
 
     def crawl(self):
+        if self.max_threads > 1:
+            yield from self._crawl_in_threads()
+            return
         while True:
             try:
                 # Return all resource URLs from the previously processed folder
@@ -375,6 +522,51 @@ class DirectoryCrawler(Crawler):
                 except IndexError:
                     break
 
+    def _crawl_in_threads(self):
+        """Crawl through the repository, processing up to
+        `max_threads` folders at the same time. The resources are
+        yielded as soon as they are found, so the normalizing threads
+        do not have to wait for the whole tree to be explored.
+        """
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(self.max_threads, self.PER_HOST_CONCURRENCY),
+                thread_name_prefix=self.__class__.__name__) as executor:
+            pending = set()
+            while True:
+                while self._results:
+                    yield self._results.pop()
+                while self._to_process:
+                    pending.add(executor.submit(
+                        self._process_folder_in_thread, self._to_process.pop()))
+                if not pending:
+                    # the threads add to the lists before they are done
+                    break
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    future.result()  # raise the errors which occurred in the threads
+
+    def _get_host_semaphore(self):
+        """Returns the semaphore which limits the number of folders
+        processed at the same time on the crawler's host. It is shared
+        by all the crawlers which explore the same host.
+        """
+        host = self.root_url.netloc
+        with self._host_semaphores_lock:
+            try:
+                return self._host_semaphores[host]
+            except KeyError:
+                semaphore = self._host_semaphores[host] = threading.BoundedSemaphore(
+                    self.PER_HOST_CONCURRENCY)
+                return semaphore
+
+    def _process_folder_in_thread(self, folder_path):
+        """Process a folder without exceeding the number of concurrent
+        requests allowed on the host
+        """
+        with self._get_host_semaphore():
+            self._process_folder(folder_path)
+
     @classmethod
     def _folder_coverage(cls, folder_path, time_zone=timezone.utc):
         """
@@ -389,52 +581,73 @@ class DirectoryCrawler(Crawler):
           - .../yyyy/ddd/... (day of year)
         It will need to be updated to support new structures.
         """
-        folder_coverage_start = folder_coverage_stop = None
+        date_fields = cls._folder_date_fields(folder_path)
+        if date_fields is None:
+            return (None, None)
+        year, month, day, days = date_fields
+        folder_coverage_start = datetime(year, month, 1, tzinfo=time_zone) + timedelta(day - 1)
+        folder_coverage_stop = folder_coverage_start + timedelta(days)
+        return (folder_coverage_start, folder_coverage_stop)
+
+    @classmethod
+    def _folder_coverage_timestamps(cls, folder_path):
+        """Same as _folder_coverage() in UTC, but the limits are
+        returned as POSIX timestamps. They are computed with integer
+        arithmetic, which is cheaper than building datetime objects for
+        each folder.
+        """
+        date_fields = cls._folder_date_fields(folder_path)
+        if date_fields is None:
+            return (None, None)
+        year, month, day, days = date_fields
+        # timegm() accepts days beyond the end of the month
+        folder_coverage_start = calendar.timegm((year, month, day, 0, 0, 0))
+        return (folder_coverage_start, folder_coverage_start + days * 86400)
 
-        match_day = cls.DAY_OF_MONTH_MATCHER.search(folder_path)
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _folder_date_fields(cls, folder_path):
+        """Memoized date extraction for _folder_coverage() and
+        _folder_coverage_timestamps(). The same paths are checked again
+        when a crawler is reused or when several searches explore the
+        same repository.
+        Returns a (year, month, day, number_of_days) tuple where `day`
+        can be greater than the length of the month for day of year
+        folders, or None if no date is found in the path.
+        The matchers are anchored at the start of the path, so match()
+        is used instead of search().
+        """
+        # most paths do not contain any date, they are rejected with a
+        # single scan instead of trying each matcher
+        if not cls.YEAR_FINDER.search(folder_path):
+            return None
+
+        match_day = cls.DAY_OF_MONTH_MATCHER.match(folder_path)
         if match_day:
-            folder_coverage_start = datetime(
-                int(match_day.group('year')),
-                int(match_day.group('month')),
-                int(match_day.group('day')),
-                tzinfo=time_zone)
-            folder_coverage_stop = folder_coverage_start + timedelta(days=1)
-            return (folder_coverage_start, folder_coverage_stop)
-
-        match_day_of_year = cls.DAY_OF_YEAR_MATCHER.search(folder_path)
+            return (int(match_day.group('year')),
+                    int(match_day.group('month')),
+                    int(match_day.group('day')),
+                    1)
+
+        match_day_of_year = cls.DAY_OF_YEAR_MATCHER.match(folder_path)
         if match_day_of_year:
-            offset = timedelta(int(match_day_of_year.group('day')) - 1)
-            folder_coverage_start = datetime(
-                int(match_day_of_year.group('year')), 1, 1,
-                tzinfo=time_zone) + offset
-            folder_coverage_stop = folder_coverage_start + timedelta(days=1)
-            return (folder_coverage_start, folder_coverage_stop)
-
-        match_month = cls.MONTH_MATCHER.search(folder_path)
+            return (int(match_day_of_year.group('year')),
+                    1,
+                    int(match_day_of_year.group('day')),
+                    1)
+
+        match_month = cls.MONTH_MATCHER.match(folder_path)
         if match_month:
-            last_day_of_month = calendar.monthrange(
-                int(match_month.group('year')), int(match_month.group('month')))[1]
-            folder_coverage_start = datetime(
-                int(match_month.group('year')),
-                int(match_month.group('month')),
-                1,
-                tzinfo=time_zone)
-            folder_coverage_stop = datetime(
-                int(match_month.group('year')),
-                int(match_month.group('month')),
-                last_day_of_month,
-                tzinfo=time_zone) + timedelta(days=1)
-            return (folder_coverage_start, folder_coverage_stop)
-
-        match_year = cls.YEAR_MATCHER.search(folder_path)
+            year = int(match_month.group('year'))
+            month = int(match_month.group('month'))
+            return (year, month, 1, calendar.monthrange(year, month)[1])
+
+        match_year = cls.YEAR_MATCHER.match(folder_path)
         if match_year:
-            folder_coverage_start = datetime(int(match_year.group('year')), 1, 1,
-                                             tzinfo=time_zone)
-            folder_coverage_stop = datetime(int(match_year.group('year')) + 1, 1, 1,
-                                            tzinfo=time_zone)
-            return (folder_coverage_start, folder_coverage_stop)
+            year = int(match_year.group('year'))
+            return (year, 1, 1, 366 if calendar.isleap(year) else 365)
 
-        return (folder_coverage_start, folder_coverage_stop)
+        return None
 
     def _intersects_time_range(self, start_time=None, stop_time=None):
         """
@@ -447,6 +660,12 @@ class DirectoryCrawler(Crawler):
         return ((not start_time or not self.time_range[1] or start_time <= self.time_range[1]) and
                 (not stop_time or not self.time_range[0] or stop_time >= self.time_range[0]))
 
+    def _intersects_time_range_timestamps(self, start_time=None, stop_time=None):
+        """Same as _intersects_time_range() with POSIX timestamps"""
+        range_start, range_stop = self._time_range_timestamps
+        return ((start_time is None or start_time <= range_stop) and
+                (stop_time is None or stop_time >= range_start))
+
     def _list_folder_contents(self, folder_path):
         """Lists the contents of a folder. Should return absolute paths"""
         raise NotImplementedError()
@@ -458,7 +677,12 @@ class DirectoryCrawler(Crawler):
     def get_download_url(self, path):
         """Get the download URL from a path in the repository
         """
-        return urljoin(self.base_url, path)
+        # concatenating is much cheaper than urljoin() and gives the
+        # same result for plain absolute paths
+        if (self.root_url.netloc and path.startswith('/') and
+                not path.startswith('//') and '/.' not in path):
+            return self._base_url + path
+        return urljoin(self._base_url, path)
 
     def _add_url_to_return(self, path):
         """
@@ -466,35 +690,53 @@ class DirectoryCrawler(Crawler):
         checking that it fits inside the crawler's time range.
         """
         download_url = self.get_download_url(path)
-        if download_url is not None:
+        if download_url is not None and self._add_to_seen(self._results_seen, download_url):
             dataset_info = DatasetInfo(download_url)
-            if dataset_info not in self._results:
-                self.logger.debug("Adding '%s' to the list of resources.", dataset_info)
-                self._results.append(dataset_info)
+            self.logger.debug("Adding '%s' to the list of resources.", dataset_info)
+            self._results.append(dataset_info)
 
     def _add_folder_to_process(self, path):
         """Add a folder to the list of folder which will be explored later"""
-        if self._intersects_time_range(*self._folder_coverage(path)):
-            if path not in self._to_process:
+        if self._intersects_time_range_timestamps(*self._folder_coverage_timestamps(path)):
+            # the seen folder paths are kept for the whole crawl
+            path = sys.intern(path)
+            if self._add_to_seen(self._to_process_seen, path):
                 self.logger.debug("Adding '%s' to the list of pages to process.", path)
                 self._to_process.append(path)
 
+    def _add_to_seen(self, seen, value):
+        """Add value to the `seen` set. Returns False if it was
+        already in it. Folders can be processed in several threads,
+        so the check and the addition are done under a lock.
+        """
+        with self._seen_lock:
+            if value in seen:
+                return False
+            seen.add(value)
+            return True
+
     def _process_folder(self, folder_path):
         """
         Get the contents of a folder and feed the _urls (based on includes) and _to_process
         attributes
         """
         self.logger.debug("Looking for resources in '%s'...", folder_path)
+        # bind the methods used in the loop once per folder
+        exclude_search = self.EXCLUDE.search if self.EXCLUDE else None
+        include_search = self.include.search if self.include else None
+        root_path_startswith = self.root_url.path.startswith
+        strip_chars = f"{os.sep}/"
+        is_folder = self._is_folder
         for path in self._list_folder_contents(folder_path):
             # deselect paths which contains any of the excludes strings
-            if ((self.EXCLUDE and self.EXCLUDE.search(path)) or
-                    self.root_url.path.startswith(path.rstrip(f"{os.sep}/"))):
+            if ((exclude_search and exclude_search(path)) or
+                    root_path_startswith(path.rstrip(strip_chars))):
                 continue
-            if self._is_folder(path):
-                self._add_folder_to_process(path)
             # select paths which are matched based on input config file
-            if self.include and self.include.search(path):
+            if include_search and include_search(path):
                 self._add_url_to_return(path)
+            if is_folder(path):
+                self._add_folder_to_process(path)
 
     # --------- get metadata ---------
     def get_normalized_attributes(self, dataset_info, **kwargs):
@@ -506,16 +748,36 @@ class LocalDirectoryCrawler(DirectoryCrawler):
 
     logger = logging.getLogger(__name__ + '.LocalDirectoryCrawler')
 
+    def set_initial_state(self):
+        """In addition to the DirectoryCrawler's attributes, the
+        `_listed_folders` dictionary stores whether each path found
+        while listing a folder is itself a folder, so that
+        _is_folder() does not need to stat it again.
+        """
+        super().set_initial_state()
+        self._listed_folders = {}
+
     # ------------- crawl ------------
     def _list_folder_contents(self, folder_path):
+        """Generator which yields the paths contained in a folder as
+        they are read, so that large folders are not held in memory
+        """
         if self._is_folder(folder_path):
-            return [os.path.join(folder_path, file_path) for file_path in os.listdir(folder_path)]
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    # DirEntry.is_dir() uses the data read with the
+                    # directory listing on most platforms
+                    self._listed_folders[entry.path] = entry.is_dir()
+                    yield entry.path
         else:
             # if the given path points to a file, just return it
-            return [folder_path]
+            yield folder_path
 
     def _is_folder(self, path):
-        return os.path.isdir(path)
+        is_folder = self._listed_folders.pop(path, None)
+        if is_folder is None:
+            is_folder = os.path.isdir(path)
+        return is_folder
 
     # --------- get metadata ---------
     def get_normalized_attributes(self, dataset_info, **kwargs):
@@ -528,27 +790,71 @@ class HTMLDirectoryCrawler(DirectoryCrawler):
     logger = logging.getLogger(__name__ + '.HTMLDirectoryCrawler')
 
     FOLDERS_SUFFIXES = ('/',)
+    FOLDER_PAGE_MATCHER = re.compile(r'/(\w+\.html)?$')
+
+    # each thread reuses its own parsers
+    _link_extractors = threading.local()
+    # each crawler keeps the folders contents for some time, so that
+    # the folders are not requested again when the crawler is reused.
+    # If the server sent an ETag or a Last-Modified header, the
+    # contents are revalidated with a conditional request instead.
+    # Set to 0 to disable the cache.
+    LISTING_CACHE_TTL = 300
+
+    def __init__(self, *args, **kwargs):
+        self._listing_cache = utils.TTLCache(maxsize=2048, ttl=self.LISTING_CACHE_TTL)
+        super().__init__(*args, **kwargs)
 
     # ------------- crawl ------------
-    @staticmethod
-    def _strip_folder_page(folder_path):
+    @classmethod
+    def _strip_folder_page(cls, folder_path):
         """
         Remove the index page of a folder path.
         For example: /foo/bar/contents.html becomes /foo/bar.
         """
-        return re.sub(r'/(\w+\.html)?$', r'', folder_path)
+        return cls.FOLDER_PAGE_MATCHER.sub('', folder_path)
 
     def _is_folder(self, path):
         return path.endswith(self.FOLDERS_SUFFIXES)
 
     @classmethod
     def _get_links(cls, html):
-        """Returns the list of links contained in an HTML page, passed as a string"""
-        parser = LinkExtractor()
+        """Returns the list of links contained in an HTML page, passed
+        as a string. lxml's parser is used when it is available, and
+        the pure python LinkExtractor otherwise.
+        """
         cls.logger.debug("Parsing HTML data.")
+        if lxml is not None:
+            try:
+                return cls._get_links_lxml(html)
+            except ValueError:  # the page could not be encoded
+                pass
+        try:
+            parser = cls._link_extractors.parser
+        except AttributeError:
+            parser = cls._link_extractors.parser = LinkExtractor()
+        else:
+            parser.reset()
         parser.feed(html)
         return parser.links
 
+    @classmethod
+    def _get_links_lxml(cls, html):
+        """Returns the list of links contained in an HTML page using
+        lxml's HTML parser
+        """
+        try:
+            parser = cls._link_extractors.lxml_parser
+        except AttributeError:
+            parser = cls._link_extractors.lxml_parser = lxml.etree.HTMLParser(encoding='utf-8')
+        # lxml does not accept strings which contain an encoding
+        # declaration, so the page is passed as bytes with the
+        # encoding fixed in the parser
+        root = lxml.etree.fromstring(html.encode('utf-8'), parser)
+        if root is None:
+            return []
+        return root.xpath('//a/@href', smart_strings=False)
+
     @staticmethod
     def _prepend_parent_path(parent_path, paths):
         """
@@ -561,15 +867,60 @@ class HTMLDirectoryCrawler(DirectoryCrawler):
         for path in paths:
             if path.startswith(parent_path):
                 result.append(path)
-            else:
+            # urljoin() is only needed for absolute URLs or paths, and
+            # to resolve dot segments. Plain relative paths can be
+            # concatenated.
+            elif ':' in path or path.startswith(('/', '.')) or '/.' in path:
                 result.append(urljoin(parent_path, path))
+            else:
+                result.append(parent_path + path)
         return result
 
+    @staticmethod
+    def _get_page_text(response):
+        """Returns the text of an HTML page. When the server does not
+        declare the encoding, the page is decoded as UTF-8 instead of
+        letting requests guess the encoding, which means analyzing the
+        whole page.
+        """
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        return response.text
+
+    @staticmethod
+    def _make_conditional_headers(etag, last_modified):
+        """Build the headers of a request which only returns the page
+        if it changed since it was last retrieved
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
     def _list_folder_contents(self, folder_path):
-        request_parameters = {}
-        html = self._http_get(f"{self.base_url}{folder_path}", request_parameters).text
-        stripped_folder_path = self._strip_folder_page(folder_path)
-        return self._prepend_parent_path(stripped_folder_path, self._get_links(html))
+        url = f"{self.base_url}{folder_path}"
+        cached = self._listing_cache.get(url)
+        if cached is not None:
+            etag, last_modified, contents = cached
+            if not (etag or last_modified):
+                return list(contents)
+            request_parameters = {
+                'headers': self._make_conditional_headers(etag, last_modified)}
+        else:
+            request_parameters = {}
+
+        response = self._http_get(url, request_parameters)
+        if cached is None or response.status_code != 304:
+            stripped_folder_path = self._strip_folder_page(folder_path)
+            contents = tuple(self._prepend_parent_path(
+                stripped_folder_path, self._get_links(self._get_page_text(response))))
+            cached = (response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                      contents)
+        # revalidated contents are kept for another LISTING_CACHE_TTL
+        self._listing_cache[url] = cached
+        return list(contents)
 
     # --------- get metadata ---------
     def get_normalized_attributes(self, dataset_info, **kwargs):
@@ -591,6 +942,11 @@ class OpenDAPCrawler(HTMLDirectoryCrawler):
     EXCLUDE = re.compile(r'\?')
     GLOBAL_ATTRIBUTES_NAME = 'NC_GLOBAL'
     NAMESPACE_REGEX = r'^\{(\S+)\}Dataset$'
+    DDX_CHUNK_SIZE = 1 << 16
+    GLOBAL_ATTRIBUTES_XPATH = f"./default:Attribute[@name='{GLOBAL_ATTRIBUTES_NAME}']/default:Attribute"
+    PARAMETERS_XPATH = "./default:Grid/default:Attribute[@name='standard_name']"
+    VALUE_XPATH = "./default:value"
+    EXCLUDED_PARAMETERS = frozenset(('latitude', 'longitude'))
 
     # --------- get metadata ---------
     def _get_xml_namespace(self, root):
@@ -606,33 +962,29 @@ class OpenDAPCrawler(HTMLDirectoryCrawler):
         """
         Extracts the global or specific attributes of a dataset or specific ones from a DDX document
 
-        "x_path_global" is pointing to the 'NC_GLOBAL' part of response of the DDX document to
-        obtain general information.
-        "x_path_specific" is used to extract the dataset parameter names from the DDX document.
+        GLOBAL_ATTRIBUTES_XPATH is pointing to the 'NC_GLOBAL' part of response of the DDX document
+        to obtain general information.
+        PARAMETERS_XPATH is used to extract the dataset parameter names from the DDX document.
         """
         self.logger.debug("Getting the dataset's global attributes.")
         namespaces = {'default': self._get_xml_namespace(root)}
-        extracted_attributes = {}
-        x_path_global = "./default:Attribute[@name='NC_GLOBAL']/default:Attribute"
-        x_path_specific = "./default:Grid/default:Attribute[@name='standard_name']"
         # finding the global metadata
-        for attribute in root.findall(x_path_global, namespaces):
-            extracted_attributes[attribute.get('name')] = attribute.find(
-                "./default:value", namespaces).text
+        extracted_attributes = {
+            attribute.get('name'): attribute.find(self.VALUE_XPATH, namespaces).text
+            for attribute in root.findall(self.GLOBAL_ATTRIBUTES_XPATH, namespaces)
+        }
         # finding the parameters of the dataset that are declared in
-        # the online source (specific metadata)
+        # the online source (specific metadata), except latitude and
+        # longitude.
         # The specific ones are stored in 'raw_dataset_parameters' part of
         # the returned dictionary("extracted_attributes")
-        extracted_attributes['raw_dataset_parameters'] = list()
-        for attribute in root.findall(x_path_specific, namespaces):
-            extracted_attributes['raw_dataset_parameters'].append(
-                attribute.find("./default:value", namespaces).text)
-        # removing the "latitude" and "longitude" from
-        # the 'raw_dataset_parameters' part of the dictionary
-        if 'latitude' in extracted_attributes['raw_dataset_parameters']:
-            extracted_attributes['raw_dataset_parameters'].remove('latitude')
-        if 'longitude' in extracted_attributes['raw_dataset_parameters']:
-            extracted_attributes['raw_dataset_parameters'].remove('longitude')
+        parameters = (
+            attribute.find(self.VALUE_XPATH, namespaces).text
+            for attribute in root.findall(self.PARAMETERS_XPATH, namespaces)
+        )
+        extracted_attributes['raw_dataset_parameters'] = [
+            parameter for parameter in parameters if parameter not in self.EXCLUDED_PARAMETERS
+        ]
         return extracted_attributes
 
     @classmethod
@@ -654,10 +1006,15 @@ class OpenDAPCrawler(HTMLDirectoryCrawler):
         the provided URL
         """
         ddx_url = self.get_ddx_url(dataset_info.url)
-        # Get the metadata from the dataset as an XML tree
-        stream = io.BytesIO(self._http_get(ddx_url, request_parameters={'stream': True}).content)
+        # Get the metadata from the dataset as an XML tree. The
+        # response is fed to the parser as it is downloaded instead of
+        # being buffered in memory first
+        parser = ET.XMLParser()
+        with self._http_get(ddx_url, request_parameters={'stream': True}) as response:
+            for chunk in response.iter_content(chunk_size=self.DDX_CHUNK_SIZE):
+                parser.feed(chunk)
         # Get all the global attributes of the Dataset into a dictionary
-        extracted_attributes = self._extract_attributes(ET.parse(stream).getroot())
+        extracted_attributes = self._extract_attributes(parser.close())
         # add the URL to the attributes passed to metanorm
         self.add_url(dataset_info.url, extracted_attributes)
         # Get the parameters needed to create a geospaas catalog dataset from the global attributes
@@ -678,6 +1035,21 @@ class ThreddsCrawler(OpenDAPCrawler):
     EXCLUDE = re.compile(r'/thredds/catalog.html$')
     url_matcher = re.compile(r'^(.*)/(fileServer)/(.*)$')
 
+    # ------------- crawl ------------
+    def set_initial_state(self):
+        """The `_dataset_pages_seen` set contains the paths of the
+        dataset pages which have already been requested
+        """
+        super().set_initial_state()
+        self._dataset_pages_seen = set()
+
+    def _add_url_to_return(self, path):
+        """Getting the download URL requires a request to the dataset
+        page, so each page is only requested once
+        """
+        if self._add_to_seen(self._dataset_pages_seen, path):
+            super()._add_url_to_return(path)
+
     # --------- get metadata ---------
     @classmethod
     def get_ddx_url(cls, url):
@@ -689,7 +1061,7 @@ class ThreddsCrawler(OpenDAPCrawler):
 
     def get_download_url(self, path):
         result = None
-        links = self._get_links(self._http_get(urljoin(self.base_url, path)).text)
+        links = self._get_links(self._get_page_text(self._http_get(urljoin(self.base_url, path))))
         for link in links:
             if "fileServer" in link and link.endswith(self.FILES_SUFFIXES):
                 result = f"{self.base_url}{link}"
@@ -703,6 +1075,19 @@ class FTPCrawler(DirectoryCrawler):
     terms
     """
     logger = logging.getLogger(__name__ + '.FTPCrawler')
+    # FTP servers often limit the number of connections per client
+    PER_HOST_CONCURRENCY = 4
+    # hosts which do not support the MLSD command
+    _no_mlsd_hosts = set()
+    # paths with these suffixes are considered to be files without
+    # checking on the server
+    FILES_SUFFIXES = ('.nc', '.nc4', '.h5', '.hdf', '.grb', '.grib', '.gz', '.bz2', '.zip', '.tar')
+    # formats of the lines returned by the LIST command
+    UNIX_LIST_MATCHER = re.compile(
+        r'^(?P<type>[-dlbcps])[-rwxsStT]{9}\S*\s+(\S+\s+){3,4}[A-Za-z]{3}\s+\d{1,2}\s+'
+        r'(\d{1,2}:\d{2}|\d{4})\s+(?P<name>.+)$')
+    WINDOWS_LIST_MATCHER = re.compile(
+        r'^\d{2}-\d{2}-\d{2,4}\s+\d{1,2}:\d{2}([AP]M)?\s+(?P<type><DIR>|\d+)\s+(?P<name>.+)$')
 
     def __init__(self, root_url, time_range=(None, None), include=None,
                  username=None, password=None, max_threads=1):
@@ -714,20 +1099,25 @@ class FTPCrawler(DirectoryCrawler):
         if password is None:
             password = 'anonymous'
         self.ftp = None
+        # connections used by the folder processing threads
+        self._thread_connections = threading.local()
 
-        super().__init__(root_url, time_range, include, max_threads=1,
+        super().__init__(root_url, time_range, include, max_threads=max_threads,
                          username=username, password=password)
 
     def __getstate__(self):
         """Method used to pickle the crawler"""
-        state = self.__dict__
+        state = self.__dict__.copy()
         if isinstance(state['ftp'], ftplib.FTP):
             state['ftp'] = None
+        del state['_thread_connections']
+        state.pop('_opened_connections', None)
         return state
 
     def __setstate__(self, state):
         """Method used to unpickle the crawler"""
         self.__dict__.update(state)
+        self._thread_connections = threading.local()
         self.connect()
 
     # ------------- crawl ------------
@@ -735,20 +1125,54 @@ class FTPCrawler(DirectoryCrawler):
         """
         The `_urls` attribute contains URLs to the resources which will be returned by the crawler.
         The `_to_process` attribute contains URLs to pages which need to be searched for resources.
+        The `_listed_folders` dictionary stores the type of the paths listed with MLSD.
         """
         self._results = []
         self._to_process = [self.root_url.path or '/']
+        self._results_seen = set()
+        self._to_process_seen = set(self._to_process)
+        self._listed_folders = {}
         self.connect()
 
     def connect(self):
-        """Creates an FTP connection and logs in"""
-        self.ftp = ftplib.FTP(self.root_url.netloc, user=self.username, passwd=self.password)
+        """Creates an FTP connection and logs in. In a folder
+        processing thread, only the thread's connection is replaced.
+        """
+        ftp = ftplib.FTP(self.root_url.netloc, user=self.username, passwd=self.password)
         try:
-            self.ftp.login(self.username, self.password)
+            ftp.login(self.username, self.password)
         except ftplib.error_perm as err_content:
             # these errors happen when we try to log in twice, so they can be ignored
             if not (err_content.args[0].startswith('503') or err_content.args[0].startswith('230')):
                 raise
+        if hasattr(self._thread_connections, 'ftp'):
+            self._thread_connections.ftp = ftp
+            self._opened_connections.append(ftp)
+        else:
+            self.ftp = ftp
+
+    @property
+    def _connection(self):
+        """The FTP connection of the current thread"""
+        return getattr(self._thread_connections, 'ftp', self.ftp)
+
+    def _crawl_in_threads(self):
+        """Each folder processing thread uses its own FTP connection,
+        which is closed at the end of the crawl
+        """
+        self._opened_connections = []
+        try:
+            yield from super()._crawl_in_threads()
+        finally:
+            for ftp in self._opened_connections:
+                ftp.close()
+            del self._opened_connections
+
+    def _process_folder_in_thread(self, folder_path):
+        if not hasattr(self._thread_connections, 'ftp'):
+            self._thread_connections.ftp = None
+            self.connect()
+        super()._process_folder_in_thread(folder_path)
 
     class Decorators():
         """Decorators for the FTPCrawler"""
@@ -785,13 +1209,112 @@ class FTPCrawler(DirectoryCrawler):
 
     @Decorators.retry_on_timeout(tries=5)
     def _list_folder_contents(self, folder_path):
-        return self.ftp.nlst(folder_path)
+        """Lists the contents of a folder using the MLSD command, which
+        also gives the type of each path. When the server does not
+        support MLSD, the output of LIST is parsed instead. Falls back
+        to NLST when folder_path is a file or when the output of LIST
+        is empty or can't be parsed.
+        """
+        if self.root_url.netloc not in self._no_mlsd_hosts:
+            try:
+                entries = list(self._connection.mlsd(folder_path, facts=['type']))
+            except ftplib.error_perm as error:
+                if error.args[0].startswith(('500', '502')):
+                    self.logger.debug("MLSD is not supported by the server, using NLST")
+                    # remembered for all the crawlers using this host
+                    self._no_mlsd_hosts.add(self.root_url.netloc)
+            else:
+                return self._get_mlsd_paths(folder_path, entries)
+        if self.root_url.netloc in self._no_mlsd_hosts:
+            entries = self._list_long(folder_path)
+            if entries:
+                return self._get_mlsd_paths(folder_path, entries)
+        return self._connection.nlst(folder_path)
+
+    def _list_long(self, folder_path):
+        """Lists the contents of a folder using the LIST command, for
+        servers which do not support MLSD. The type of each path is
+        read from the output so that changing the working directory is
+        not needed.
+        Returns the entries in the same form as mlsd(), or None if the
+        output is in an unknown format.
+        """
+        lines = []
+        try:
+            self._connection.retrlines(f"LIST {folder_path}", lines.append)
+        except ftplib.error_perm:
+            return None
+        entries = []
+        for line in lines:
+            if not line or line.startswith('total '):
+                continue
+            entry = self._parse_list_line(line)
+            if entry is None:
+                self.logger.debug("Unknown LIST format, using NLST: '%s'", line)
+                return None
+            entries.append(entry)
+        return entries
+
+    @classmethod
+    def _parse_list_line(cls, line):
+        """Parse a line returned by the LIST command in UNIX or Windows
+        format. Returns a (name, facts) tuple like mlsd(), or None if
+        the line can't be parsed.
+        """
+        match = cls.UNIX_LIST_MATCHER.match(line)
+        if match:
+            name = match.group('name')
+            path_type = match.group('type')
+            if path_type == 'l':
+                # the type of the link target is checked by _is_folder()
+                name = name.split(' -> ', 1)[0]
+                path_type = ''
+            elif path_type == 'd':
+                path_type = 'dir'
+            else:
+                path_type = 'file'
+        else:
+            match = cls.WINDOWS_LIST_MATCHER.match(line)
+            if not match:
+                return None
+            name = match.group('name')
+            path_type = 'dir' if match.group('type') == '<DIR>' else 'file'
+        if name in ('.', '..'):
+            path_type = 'cdir' if name == '.' else 'pdir'
+        return (name, {'type': path_type})
+
+    def _get_mlsd_paths(self, folder_path, entries):
+        """Returns the paths from the result of a MLSD command, or of a
+        LIST command parsed by _list_long(), and remembers which ones
+        are folders
+        """
+        prefix = folder_path.rstrip('/') + '/'
+        paths = []
+        for name, facts in entries:
+            path_type = facts.get('type', '').lower()
+            if path_type in ('cdir', 'pdir'):
+                continue
+            path = prefix + name
+            # other types, like symbolic links, are checked by _is_folder()
+            if path_type in ('dir', 'file'):
+                self._listed_folders[path] = path_type == 'dir'
+            paths.append(path)
+        return paths
 
     @Decorators.retry_on_timeout(tries=5)
     def _is_folder(self, path):
-        """Determine if path is a folder by trying to change the working directory to path."""
+        """Determine if path is a folder. The type of the paths listed
+        with MLSD is already known, and paths ending with one of
+        FILES_SUFFIXES are files. For other paths try to change the
+        working directory to path.
+        """
+        is_folder = self._listed_folders.pop(path, None)
+        if is_folder is not None:
+            return is_folder
+        if path.endswith(self.FILES_SUFFIXES):
+            return False
         try:
-            self.ftp.cwd(path)
+            self._connection.cwd(path)
         except ftplib.error_perm:
             return False
         else:
@@ -870,23 +1393,56 @@ class HTTPPaginatedAPICrawler(Crawler):
         }
 
     def crawl(self):
-        while True:
-            try:
-                # Return all resource URLs from the previously processed page
-                yield self._results.pop()
-            except IndexError:
-                # If no more URLs from the previously processed page are available,
-                # process the next one
-                if not self._get_datasets_info(self._get_next_page()):
-                    self.logger.debug("No more entries found at '%s' matching '%s'",
-                                    self.url, self.request_parameters['params'])
-                    break
+        # once a page has been parsed and contains entries, the next
+        # one is downloaded in a separate thread while the results are
+        # processed. Pages after the last one are never requested.
+        # The prefetching thread does not modify the crawler: the
+        # offset is only incremented when a page is used.
+        prefetcher = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=self.__class__.__name__)
+        next_page = None
+        try:
+            while True:
+                try:
+                    # Return all resource URLs from the previously processed page
+                    yield self._results.pop()
+                except IndexError:
+                    # If no more URLs from the previously processed page are available,
+                    # process the next one
+                    if next_page is not None:
+                        page = next_page.result()
+                        next_page = None
+                        self.increment_offset()
+                    else:
+                        page = self._get_next_page()
+                    if not self._get_datasets_info(page):
+                        self.logger.debug("No more entries found at '%s'", self.url)
+                        break
+                    next_page = prefetcher.submit(self._get_page, self._copy_request_parameters())
+        finally:
+            # if the iteration is stopped early, the prefetched page is
+            # not needed and its request is not waited for
+            if next_page is not None:
+                next_page.cancel()
+            prefetcher.shutdown(wait=False)
+
+    def _copy_request_parameters(self):
+        """Returns a copy of the request parameters which is not
+        affected by later changes of the offset
+        """
+        return {**self.request_parameters, 'params': self.request_parameters['params'].copy()}
+
+    def _get_page(self, request_parameters):
+        """Get the page of search results defined by
+        `request_parameters`
+        """
+        self.logger.debug("Looking for resources at '%s', matching '%s'",
+                         self.url, request_parameters['params'])
+        return self._http_get(self.url, request_parameters).text
 
     def _get_next_page(self):
         """Get the next page of search results"""
-        self.logger.debug("Looking for resources at '%s', matching '%s'",
-                         self.url, self.request_parameters['params'])
-        current_page = self._http_get(self.url, self.request_parameters).text
+        current_page = self._get_page(self._copy_request_parameters())
         self.increment_offset()
         return current_page
 
@@ -204,7 +204,7 @@ class Ingester():
                                                  dataset_entry_id, url)
 
                     except Exception as error:  # pylint: disable=broad-except
-                        self.logger.error("Error during ingestion: %s", str(error), exc_info=True)
+                        self.logger.error("Error during ingestion: %s", error, exc_info=True)
                     finally:
                         futures.remove(future)  # avoid keeping finished futures in memory
             except KeyboardInterrupt:
@@ -3,7 +3,6 @@ import logging
 
 from shapely.geometry.polygon import Polygon
 
-import geospaas_harvesting.ingesters as ingesters
 from ..arguments import ArgumentParser, DatetimeArgument, DictArgument, WKTArgument
 
 
@@ -58,19 +57,44 @@ class Provider(FilterMixin):
     specific parameters to the 'search_parameters' attribute in the
     form of Argument objects.
     They should also implement the _make_crawler() method.
+    Concrete providers set the 'provider_type' attribute, which is the
+    value of the 'type' setting in the providers configuration file.
     """
+    provider_type = None
+    _registry = {}
+
+    # parser for the search parameters common to all providers. Each
+    # instance works on its own copy, which subclasses can extend
+    search_parameters_parser = ArgumentParser([
+        DatetimeArgument('start_time', default=None),
+        DatetimeArgument('end_time', default=None),
+        WKTArgument('location', geometry_types=(Polygon,)),
+        DictArgument('ingester', default={})
+    ])
+
+    def __init_subclass__(cls, **kwargs):
+        """Register the providers by type so that they can be found
+        without walking through all the subclasses
+        """
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get('provider_type') is not None:
+            Provider._registry[cls.provider_type] = cls
+
+    @classmethod
+    def get_provider_class(cls, provider_type):
+        """Returns the provider class registered for `provider_type`"""
+        try:
+            return cls._registry[provider_type]
+        except KeyError as error:
+            raise ValueError(f"Unknown provider type '{provider_type}'") from error
 
     def __init__(self, *args, **kwargs):
         self.name = kwargs.get('name', 'unknown')
         self.username = kwargs.get('username')
         self.password = kwargs.get('password')
 
-        self.search_parameters_parser = ArgumentParser([
-            DatetimeArgument('start_time', default=None),
-            DatetimeArgument('end_time', default=None),
-            WKTArgument('location', geometry_types=(Polygon,)),
-            DictArgument('ingester', default={})
-        ])
+        self.search_parameters_parser = ArgumentParser(
+            Provider.search_parameters_parser.arguments.values())
 
     def __repr__(self):
         return f"{self.__class__.__name__}(name={self.name}, username={self.username}, password=*)"
@@ -89,6 +113,9 @@ class Provider(FilterMixin):
         """Returns a Search object which can be used to explore the
         search results returned by the crawler
         """
+        # the ingesters module depends on the Django models, which are
+        # not needed until a search is actually run
+        import geospaas_harvesting.ingesters as ingesters  # pylint: disable=import-outside-toplevel
         parsed_parameters = self.search_parameters_parser.parse(parameters)
         ingester_params = parsed_parameters.pop('ingester')
         filters = self._make_filters(parsed_parameters)
@@ -8,6 +8,7 @@ from ..crawlers import FTPCrawler
 
 class CEDAProvider(TimeFilterMixin, Provider):
     """Provider for CEDA FTP server"""
+    provider_type = 'ceda'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -20,6 +20,7 @@ from ..crawlers import Crawler, DatasetInfo, FTPCrawler
 
 class CMEMSProvider(Provider):
     """Provider for CMEMS using the copernicusmarine package"""
+    provider_type = 'cmems'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
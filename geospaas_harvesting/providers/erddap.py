@@ -6,6 +6,8 @@ from ..crawlers import ERDDAPTableCrawler
 
 class ERDDAPTableProvider(Provider):
     """Provider for tabledap APIs"""
+    provider_type = 'tabledap'
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.url = kwargs['url'].rstrip('/')
@@ -8,6 +8,7 @@ from ..crawlers import FTPCrawler
 
 class FTPProvider(TimeFilterMixin, Provider):
     """Generic FTP provider"""
+    provider_type = 'ftp'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
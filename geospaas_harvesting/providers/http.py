@@ -8,6 +8,7 @@ from ..crawlers import HTMLDirectoryCrawler
 
 class HTTPProvider(TimeFilterMixin, Provider):
     """Generic HTTP directory provider"""
+    provider_type = 'http'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -8,6 +8,7 @@ from ..crawlers import FTPCrawler
 
 class GPortalProvider(TimeFilterMixin, Provider):
     """Provider for JAXA GPortal FTP server"""
+    provider_type = 'gportal_ftp'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -25,6 +25,7 @@ from ..crawlers import LocalDirectoryCrawler
 class NansatProvider(TimeFilterMixin, Provider):
     """Provider for local files with metadata provided by Nansat
     """
+    provider_type = 'nansat'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -44,6 +45,7 @@ class NansatProvider(TimeFilterMixin, Provider):
 class NetCDFProvider(TimeFilterMixin, Provider):
     """Provider for local files with metadata extracted directly using
     """
+    provider_type = 'netcdf'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
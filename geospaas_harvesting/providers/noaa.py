@@ -8,6 +8,7 @@ from ..crawlers import FTPCrawler
 
 class NOAAProvider(TimeFilterMixin, Provider):
     """Provider for NOAA FTP servers"""
+    provider_type = 'noaa'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -4,6 +4,10 @@ import json
 from urllib.parse import urljoin
 
 from shapely.geometry.polygon import Polygon
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 import geospaas.catalog.managers as catalog_managers
 import geospaas_harvesting.utils as utils
@@ -22,6 +26,7 @@ class RestoProvider(Provider):
     The list of available collections and the corresponding search
     parameters are fetched from the API.
     """
+    provider_type = 'resto'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -199,7 +204,7 @@ class RestoCrawler(HTTPPaginatedAPICrawler):
         """Get dataset attributes from the current page and
         adds them to self._results.
         Returns True if attributes were found, False otherwise"""
-        entries = json.loads(page)['features']
+        entries = self._load_page(page)['features']
 
         for entry in entries:
             metadata = entry['properties']
@@ -210,6 +215,19 @@ class RestoCrawler(HTTPPaginatedAPICrawler):
 
         return bool(entries)
 
+    def _load_page(self, page):
+        """Parse a JSON page, using orjson when it is available because
+        it is much faster than json. orjson does not accept the NaN and
+        Infinity tokens, so json is used for the pages which contain
+        them.
+        """
+        if orjson is not None:
+            try:
+                return orjson.loads(page)
+            except orjson.JSONDecodeError:
+                self.logger.debug("Could not parse the page with orjson, using json")
+        return json.loads(page)
+
     # --------- get metadata ---------
     def get_normalized_attributes(self, dataset_info, **kwargs):
         """Get attributes from an API crawler"""
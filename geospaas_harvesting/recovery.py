@@ -20,29 +20,42 @@ import geospaas_harvesting.ingesters as ingesters  # pylint: disable=wrong-impor
 logger = logging.getLogger('geospaas_harvesting.recovery')
 
 
+def _load_failed_ingestions(pickle_file):
+    """Generator which yields the 2-tuples contained in a recovery
+    file. The file contains pickled lists of tuples. Files written by
+    older versions, which contain the pickled tuples one by one, are
+    supported too.
+    """
+    while True:
+        try:
+            loaded = pickle.load(pickle_file)
+        except EOFError:
+            break
+        if isinstance(loaded, list):
+            yield from loaded
+        else:
+            yield loaded
+
+
 def ingest_file(file_path):
-    """Ingest the contents of a pickle file. The file should contain an
-    ingester object followed by an arbitrary number of 2-tuples
-    containing the dataset information required by the ingester and the
-    error which happened when trying the first ingestion.
+    """Ingest the contents of a pickle file. The file should contain
+    pickled lists of 2-tuples containing the dataset information
+    required by the ingester and the error which happened when trying
+    the first ingestion.
     """
     logger.info("Getting failed ingestions from %s", file_path)
     ingester = ingesters.Ingester()
     with open(file_path, 'rb') as pickle_file:
         dataset_infos = []
-        while True:
-            try:
-                dataset_info, error = pickle.load(pickle_file)
-                if (isinstance(error, requests.ConnectionError) or
-                        isinstance(error, requests.Timeout) or
-                        (isinstance(error, requests.HTTPError) and
-                        error.response.status_code >= 500 and
-                        error.response.status_code <= 599)):
-                    dataset_infos.append(dataset_info)
-                else:
-                    logger.warning("%s error, won't retry", error.__class__.__name__)
-            except EOFError:
-                break
+        for dataset_info, error in _load_failed_ingestions(pickle_file):
+            if (isinstance(error, requests.ConnectionError) or
+                    isinstance(error, requests.Timeout) or
+                    (isinstance(error, requests.HTTPError) and
+                    error.response.status_code >= 500 and
+                    error.response.status_code <= 599)):
+                dataset_infos.append(dataset_info)
+            else:
+                logger.warning("%s error, won't retry", error.__class__.__name__)
         if dataset_infos:
             logger.info("Ingesting datasets from %s", file_path)
             ingester.ingest(dataset_infos)
@@ -1,11 +1,81 @@
 """Utilities module for geospaas_harvesting"""
+import collections
+import hashlib
+import json
 import os
+import os.path
+import tempfile
+import threading
+import time
 import xml.etree.ElementTree as ET
 from urllib.parse import urlparse
 
 import requests
 import yaml
 
+# The C implementation of the YAML loader is much faster, but is only
+# available if PyYAML was built with libyaml
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+CACHE_DIR = os.getenv(
+    'GEOSPAAS_HARVESTING_CACHE_DIR',
+    os.path.join(os.getenv('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+                 'geospaas_harvesting'))
+
+
+def cache_file_path(prefix, path):
+    """Returns the path of the JSON file used to cache the parsed
+    contents of the file at `path`. There is one cache file per source
+    file, which is overwritten when the source file changes.
+    """
+    key = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=16).hexdigest()
+    return os.path.join(CACHE_DIR, f"{prefix}_{key}.json")
+
+
+def read_cache_file(cache_path, stat):
+    """Returns the data stored in a JSON cache file if it was written
+    for a source file with the same modification time and size, None
+    otherwise. JSON is used rather than pickle so that loading a file
+    written by someone else can't execute code.
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+        if cache['mtime_ns'] == stat.st_mtime_ns and cache['size'] == stat.st_size:
+            return cache['data']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def write_cache_file(cache_path, stat, data):
+    """Writes data to a JSON cache file if it can be stored as JSON
+    without modification. The file is written to a temporary file
+    first so that concurrent processes never read a partially written
+    cache.
+    """
+    try:
+        serialized = json.dumps({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                                 'data': data})
+        if json.loads(serialized)['data'] != data:
+            return
+    except (TypeError, ValueError):
+        return
+    tmp_path = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=CACHE_DIR,
+                                         delete=False) as tmp_file:
+            tmp_path = tmp_file.name
+            tmp_file.write(serialized)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:  # pragma: no cover
+                pass
+
 
 class TrustDomainSession(requests.Session):
     """Session class which allows keeping authentication headers in
@@ -27,11 +97,70 @@ class TrustDomainSession(requests.Session):
             return super().should_strip_auth(old_url, new_url)
 
 
-def http_request(http_method, *args, **kwargs):
+class TTLCache():
+    """Thread safe cache whose entries expire `ttl` seconds after they
+    are set. When there are more than `maxsize` entries, the least
+    recently used ones are dropped. Nothing is cached if `ttl` is not
+    positive.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the value cached for `key`, or `default` if there is
+        none or if it has expired
+        """
+        with self._lock:
+            try:
+                expiration_time, value = self._entries[key]
+            except KeyError:
+                return default
+            if expiration_time <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Removes all the entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+def http_request(http_method, *args, session=None, **kwargs):
     """Wrapper around requests.request() which runs the HTTP request
     inside a TrustDomainSession if authentication is provided. This
     makes it possible to follow redirections inside the same domain.
+    If `session` is provided, the request is sent through it, which
+    allows to reuse its connections.
     """
+    if session is not None:
+        return session.request(http_method, *args, **kwargs)
     auth = kwargs.pop('auth', None)
     if auth:
         with TrustDomainSession() as session:
@@ -52,15 +181,59 @@ class EnvTag(yaml.YAMLObject):
         return os.getenv(node.value)
 
 
+class ConfigLoader(YAML_LOADER):  # pylint: disable=too-many-ancestors
+    """YAML loader for the configuration files. Supports the !ENV tag.
+    Defining a subclass avoids registering the tag on the shared
+    loader class each time a file is read.
+    """
+
+
+ConfigLoader.add_constructor('!ENV', EnvTag.from_yaml)
+
+
 def read_yaml_file(config_path):
     """Loads the harvesting configuration from a file"""
-    yaml.SafeLoader.add_constructor('!ENV', EnvTag.from_yaml)
     data = None
     with open(config_path, 'rb') as config_stream:
-        data = yaml.safe_load(config_stream)
+        data = yaml.load(config_stream, Loader=ConfigLoader)
     return data
 
 
+ENV_TAG_KEY = '!ENV'
+
+
+class RawConfigLoader(YAML_LOADER):  # pylint: disable=too-many-ancestors
+    """YAML loader for the configuration files which does not resolve
+    the !ENV tags. They are loaded as {'!ENV': variable_name}
+    dictionaries, which can be resolved later using
+    resolve_env_tags().
+    """
+
+
+RawConfigLoader.add_constructor('!ENV', lambda loader, node: {ENV_TAG_KEY: node.value})
+
+
+def read_raw_yaml_file(config_path):
+    """Loads a configuration file without resolving the !ENV tags"""
+    with open(config_path, 'rb') as config_stream:
+        return yaml.load(config_stream, Loader=RawConfigLoader)
+
+
+def resolve_env_tags(data):
+    """Returns a copy of data loaded by read_raw_yaml_file() in which
+    the !ENV tags are replaced with the value of the corresponding
+    environment variables
+    """
+    if isinstance(data, dict):
+        if data.keys() == {ENV_TAG_KEY}:
+            return os.getenv(data[ENV_TAG_KEY])
+        return {key: resolve_env_tags(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [resolve_env_tags(value) for value in data]
+    else:
+        return data
+
+
 def parse_xml_get_ns(file):
     """Parse an XML document and return an ElementTree and a dict of
     namespaces
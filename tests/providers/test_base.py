@@ -10,6 +10,7 @@ from shapely.geometry.polygon import Polygon
 
 import geospaas_harvesting.crawlers as crawlers
 import geospaas_harvesting.providers.base as providers_base
+from geospaas_harvesting.arguments import WKTArgument
 
 
 class ProviderTestCase(unittest.TestCase):
@@ -52,6 +53,36 @@ class ProviderTestCase(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             self.provider._make_crawler({})
 
+    def test_search_parameters_parser_copy(self):
+        """Adding arguments to the parser of an instance must not
+        affect the class-level parser
+        """
+        self.provider.search_parameters_parser.add_arguments([WKTArgument('foo')])
+        self.assertIn('foo', self.provider.search_parameters_parser.arguments)
+        self.assertNotIn('foo', providers_base.Provider.search_parameters_parser.arguments)
+        self.assertNotIn(
+            'foo',
+            providers_base.Provider(name='test2').search_parameters_parser.arguments)
+
+    def test_provider_registry(self):
+        """Subclasses which define a provider type must be registered
+        """
+        with mock.patch.dict(providers_base.Provider._registry, clear=True):
+            class TestProvider(providers_base.Provider):  # pylint: disable=abstract-method
+                """Provider with a type"""
+                provider_type = 'test'
+
+            class TestProviderChild(TestProvider):  # pylint: disable=abstract-method
+                """Provider which inherits its parent's type"""
+
+            self.assertDictEqual(providers_base.Provider._registry, {'test': TestProvider})
+            self.assertIs(providers_base.Provider.get_provider_class('test'), TestProvider)
+
+    def test_get_provider_class_error(self):
+        """A ValueError must be raised for unknown provider types"""
+        with self.assertRaises(ValueError):
+            providers_base.Provider.get_provider_class('foo')
+
 
 class FilterMixinTestCase(unittest.TestCase):
     """Tests for the FilterMixin class"""
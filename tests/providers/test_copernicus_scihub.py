@@ -215,6 +215,43 @@ class CopernicusOpenSearchAPICrawlerTestCase(unittest.TestCase):
                         "Products('d023819a-60d3-4b5e-bb81-645294d73b5b')/$value")
         ])
 
+    def test_get_datasets_info_without_lxml(self):
+        """_get_datasets_info() should use feedparser when lxml is not
+        available
+        """
+        data_file_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            'data/copernicus_opensearch/page1.xml')
+
+        with open(data_file_path, 'r') as f_h:
+            page = f_h.read()
+
+        with mock.patch('geospaas_harvesting.providers.copernicus_scihub.lxml', None):
+            self.assertTrue(self.crawler._get_datasets_info(page))
+        self.assertListEqual(self.crawler._results, [
+            DatasetInfo("https://scihub.copernicus.eu/dhus/odata/v1/"
+                        "Products('87ddb795-dab4-4985-85f4-c390c9cdd65b')/$value"),
+            DatasetInfo("https://scihub.copernicus.eu/dhus/odata/v1/"
+                        "Products('d023819a-60d3-4b5e-bb81-645294d73b5b')/$value")
+        ])
+
+    def test_get_datasets_info_malformed_feed(self):
+        """_get_datasets_info() should fall back to feedparser when the
+        page is not well-formed XML
+        """
+        page = ('<feed xmlns="http://www.w3.org/2005/Atom"><entry>'
+                '<link href="https://foo/bar/$value"/></entry>')
+        self.assertTrue(self.crawler._get_datasets_info(page))
+        self.assertListEqual(self.crawler._results, [DatasetInfo('https://foo/bar/$value')])
+
+    def test_get_datasets_info_empty_feed(self):
+        """_get_datasets_info() should return False when there are no
+        entries in the page
+        """
+        page = '<feed xmlns="http://www.w3.org/2005/Atom"></feed>'
+        self.assertFalse(self.crawler._get_datasets_info(page))
+        self.assertListEqual(self.crawler._results, [])
+
     def test_build_metadata_url(self):
         """Test that the metadata URL is correctly built from the dataset URL"""
         test_url = 'http://scihub.copernicus.eu/dataset/$value'
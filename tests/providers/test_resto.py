@@ -1,6 +1,7 @@
 # pylint: disable=protected-access
 """Test for the Creodias provider and crawler"""
 import json
+import math
 import os.path
 import unittest
 import unittest.mock as mock
@@ -94,12 +95,12 @@ class CollectionArgumentTestCase(unittest.TestCase):
 
         self.assertEqual(
             collection_argument.children,
-            [
+            (
                 arguments.IntegerArgument('lon', min_value=-180, max_value=180,
                                           description='lon description'),
                 arguments.ChoiceArgument('platform', valid_options=['S1A']),
                 arguments.StringArgument('swath'),
-            ]
+            )
         )
 
     def test_str(self):
@@ -312,6 +313,23 @@ class RestoCrawlerTestCase(unittest.TestCase):
         self.crawler._get_datasets_info(page)
         self.assertEqual(self.crawler._results[0], expected_result)
 
+    def test_get_datasets_info_nan(self):
+        """_get_datasets_info() should accept pages which contain NaN
+        values, with or without orjson
+        """
+        page = ('{"features": [{"properties": {"services": {"download": {"url": "https://foo/bar"}},'
+                ' "cloudCover": NaN}, "geometry": {"type": "Point", "coordinates": [1.5, 2]}}]}')
+        for orjson in (providers_resto.orjson, None):
+            with self.subTest(orjson=orjson), \
+                 mock.patch('geospaas_harvesting.providers.resto.orjson', orjson):
+                self.crawler._results.clear()
+                self.assertTrue(self.crawler._get_datasets_info(page))
+                dataset_info = self.crawler._results[0]
+                self.assertEqual(dataset_info.url, 'https://foo/bar')
+                self.assertTrue(math.isnan(dataset_info.metadata['cloudCover']))
+                self.assertEqual(dataset_info.metadata['geometry'],
+                                 '{"type": "Point", "coordinates": [1.5, 2]}')
+
     def test_get_normalized_attributes(self):
         """Test the right metadata is added when normalizing"""
         crawler = providers_resto.RestoCrawler('https://foo')
@@ -1,5 +1,6 @@
 # pylint: disable=protected-access
 """Tests for the argument classes"""
+import pickle
 import unittest
 import unittest.mock as mock
 from datetime import datetime, timezone as tz
@@ -47,6 +48,13 @@ class ArgumentParserTestCase(unittest.TestCase):
         with self.assertRaises(ValueError):
             arg_parser.parse({'foo': 'bar', 'baz': 'qux'})
 
+    def test_parse_does_not_modify_parameters(self):
+        """The parameters dictionary should be left untouched"""
+        arg_parser = arguments.ArgumentParser([arguments.AnyArgument('foo')], strict=False)
+        parameters = {'foo': 'bar', 'baz': 'qux'}
+        self.assertDictEqual(arg_parser.parse(parameters), {'foo': 'bar'})
+        self.assertDictEqual(parameters, {'foo': 'bar', 'baz': 'qux'})
+
     def test_str(self):
         """Test the string representation"""
         argument = arguments.AnyArgument('foo')
@@ -71,6 +79,18 @@ class ArgumentTestCase(unittest.TestCase):
         self.assertNotEqual(arguments.Argument('foo', required=True),
                             arguments.Argument('foo', required=False))
 
+    def test_equality_different_types(self):
+        """Arguments of different types are not equal"""
+        self.assertNotEqual(arguments.AnyArgument('foo'), arguments.ListArgument('foo'))
+        self.assertNotEqual(arguments.AnyArgument('foo'), 'foo')
+
+    def test_pickle_no_default(self):
+        """The sentinel used when there is no default value must keep
+        its identity when an argument is pickled
+        """
+        argument = pickle.loads(pickle.dumps(arguments.Argument('foo')))
+        self.assertIs(argument.default, arguments._MISSING)
+
     def test_str(self):
         """Test the string representation"""
         self.assertEqual(
@@ -152,6 +172,9 @@ class DatetimeArgumentTestCase(unittest.TestCase):
         arg = arguments.DatetimeArgument('foo')
         self.assertEqual(arg.parse('2023-01-01T00:00:00Z'), datetime(2023, 1, 1, tzinfo=tz.utc))
         self.assertEqual(arg.parse('2023-01-01'), datetime(2023, 1, 1, tzinfo=tz.utc))
+        self.assertEqual(arg.parse('2023-01-01T01:00:00+01:00'),
+                         datetime(2023, 1, 1, tzinfo=tz.utc))
+        self.assertEqual(arg.parse('January 1st 2023'), datetime(2023, 1, 1, tzinfo=tz.utc))
         self.assertIsNone(arg.parse(None))
 
 
@@ -204,6 +227,20 @@ class IntegerArgumentTestCase(unittest.TestCase):
             arg.parse(0)
         with self.assertRaises(ValueError):
             arg.parse(10)
+        with self.assertRaises(ValueError):
+            arg.parse(True)
+
+    def test_parse_partial_bounds(self):
+        """Test integer validation when only one bound is defined"""
+        min_arg = arguments.IntegerArgument(name='foo', min_value=1)
+        self.assertEqual(min_arg.parse(100), 100)
+        with self.assertRaises(ValueError):
+            min_arg.parse(0)
+        max_arg = arguments.IntegerArgument(name='foo', max_value=5)
+        self.assertEqual(max_arg.parse(-100), -100)
+        with self.assertRaises(ValueError):
+            max_arg.parse(6)
+        self.assertEqual(arguments.IntegerArgument(name='foo').parse(-100), -100)
 
     def test_eq(self):
         """Test integer argument equality"""
@@ -258,6 +295,21 @@ class PathArgumentTestCase(unittest.TestCase):
         with self.assertRaises(ValueError):
             arg.parse('1')
 
+    def test_validate_multiple_options(self):
+        """Paths starting with any of the valid options are valid"""
+        arg = arguments.PathArgument(name='foo', valid_options=['/foo', '/bar/baz', '/qux'])
+        self.assertEqual(arg.parse('/bar/baz/quux'), '/bar/baz/quux')
+        self.assertEqual(arg.parse('/qux'), '/qux')
+        with self.assertRaises(ValueError):
+            arg.parse('/bar')
+
+    def test_validate_default(self):
+        """The default value should be validated against the valid
+        options
+        """
+        with self.assertRaises(ValueError):
+            arguments.PathArgument(name='foo', valid_options=['/foo'], default='/bar')
+
 
 class StringArgumentTestCase(unittest.TestCase):
     """Tests for the StringArgument class"""
@@ -302,6 +354,13 @@ class WKTArgumentTestCase(unittest.TestCase):
         with self.assertRaises(ValueError):
             arg.parse('POLYGON((1 2, 2 3, 3 4, 1 2))')
 
+    def test_parse_cached(self):
+        """Parsing the same WKT string twice should return the same
+        geometry object
+        """
+        arg = arguments.WKTArgument('foo', geometry_types=[shapely.geometry.Point])
+        self.assertIs(arg.parse('POINT(3 4)'), arg.parse('POINT(3 4)'))
+
     def test_eq(self):
         """Test equality between WKTArgument objects"""
         self.assertEqual(arguments.WKTArgument('foo', geometry_types=[shapely.geometry.Point]),
@@ -36,7 +36,7 @@ class CLITestCase(unittest.TestCase):
         """
         config = mock.Mock(update_vocabularies=False)
         with mock.patch('django.core.management.call_command') as mock_call_command, \
-             mock.patch('geospaas.vocabularies.models.Parameter.objects.count', return_value=2):
+             mock.patch('geospaas.vocabularies.models.Parameter.objects.exists', return_value=True):
             cli.refresh_vocabularies(config)
             mock_call_command.assert_not_called()
 
@@ -45,7 +45,7 @@ class CLITestCase(unittest.TestCase):
         and there are no Parameters in the database
         """
         config = mock.Mock(update_vocabularies=False)
-        with mock.patch('geospaas.vocabularies.models.Parameter.objects.count', return_value=0):
+        with mock.patch('geospaas.vocabularies.models.Parameter.objects.exists', return_value=False):
             with self.assertRaises(RuntimeError):
                 cli.refresh_vocabularies(config)
 
@@ -85,31 +85,43 @@ class CLITestCase(unittest.TestCase):
                 force=True,
                 versions={'gcmd_instrument': '9.1.5'})
 
+    def test_save_search_results(self):
+        """Test that the save() method of a SearchResults object is
+        called
+        """
+        search_results = mock.Mock()
+        cli.save_search_results(search_results)
+        search_results.save.assert_called_once_with()
+
+    def test_save_search_results_error(self):
+        """Errors happening during ingestion must be logged, not
+        raised
+        """
+        search_results = mock.Mock()
+        search_results.save.side_effect = RuntimeError
+        with self.assertLogs(cli.logger, level=logging.ERROR):
+            cli.save_search_results(search_results)
+
     def test_save_results(self):
-        """Test the the save() method of SearchResults objects is
-        called in separate processes
+        """Test that the results of each search are saved in separate
+        processes
         """
         searches_results = [mock.Mock(), mock.Mock()]
-        error_future = mock.Mock()
-        error_future.exception.return_value = RuntimeError
-        futures = [mock.Mock(), error_future]
-
-        with mock.patch('concurrent.futures.ProcessPoolExecutor.submit',
-                        side_effect=futures) as mock_submit, \
-             mock.patch('concurrent.futures.as_completed', side_effect=iter) as mock_as_completed, \
-             self.assertLogs(cli.logger, level=logging.ERROR):
-            cli.save_results(searches_results)
+        with mock.patch('concurrent.futures.ProcessPoolExecutor') as mock_executor_builder:
+            mock_executor = mock_executor_builder.return_value.__enter__.return_value
+            cli.save_results(iter(searches_results))
 
-        mock_submit.assert_has_calls([
-            mock.call(search_results.save) for search_results in searches_results
-        ])
-        mock_as_completed.assert_called_with(futures)
+        self.assertEqual(
+            mock_executor_builder.call_args.kwargs['mp_context'].get_start_method(),
+            'forkserver')
+        mock_executor.map.assert_called_once_with(
+            cli.save_search_results, searches_results, chunksize=1)
 
     def test_save_results_keyboard_interrupt(self):
         """Test KeyboardIbnterrupt handling"""
         with mock.patch('concurrent.futures.ProcessPoolExecutor') as mock_executor_builder:
             mock_executor = mock_executor_builder.return_value.__enter__.return_value
-            mock_executor.submit.side_effect = KeyboardInterrupt
+            mock_executor.map.side_effect = KeyboardInterrupt
             with self.assertRaises(KeyboardInterrupt):
                 cli.save_results([mock.Mock()])
         mock_executor.shutdown.assert_called()
@@ -1,9 +1,16 @@
 # pylint: disable=protected-access
 """Tests for the config module"""
+import concurrent.futures
+import json
 import logging
+import os
+import subprocess
+import sys
+import tempfile
+import types
 import unittest
 import unittest.mock as mock
-from datetime import datetime, timezone as tz
+from datetime import date, datetime, timezone as tz
 from pathlib import Path
 
 import geospaas_harvesting.config as config
@@ -11,6 +18,7 @@ import geospaas_harvesting.providers.base as providers_base
 import geospaas_harvesting.providers.podaac as providers_podaac
 import geospaas_harvesting.providers.cmems as providers_cmems
 import geospaas_harvesting.providers.resto as providers_resto
+import geospaas_harvesting.utils as utils
 
 from . import TEST_FILES_PATH
 
@@ -40,6 +48,140 @@ class ConfigurationTestCase(unittest.TestCase):
         self.assertEqual(configuration.foo, 'bar')
 
 
+class ReadYAMLFileCachedTestCase(unittest.TestCase):
+    """Tests for the read_yaml_file_cached() function"""
+
+    def setUp(self):
+        config._yaml_cache.clear()
+        self.addCleanup(config._yaml_cache.clear)
+
+    def test_read_yaml_file_cached(self):
+        """The file should only be parsed once as long as it is not
+        modified, and copies of the contents should be returned
+        """
+        with mock.patch('geospaas_harvesting.config._load_yaml_or_json_cache',
+                        return_value={'foo': ['bar']}) as mock_read:
+            first = config.read_yaml_file_cached(TEST_FILES_PATH / 'sample.yml')
+            first['foo'].append('baz')
+            second = config.read_yaml_file_cached(TEST_FILES_PATH / 'sample.yml')
+        mock_read.assert_called_once()
+        self.assertDictEqual(second, {'foo': ['bar']})
+
+    def test_read_yaml_file_cached_modified(self):
+        """The file should be parsed again if it was modified"""
+        with mock.patch('geospaas_harvesting.config._load_yaml_or_json_cache') as mock_read, \
+             mock.patch('os.stat') as mock_stat:
+            mock_stat.return_value = mock.Mock(st_mtime_ns=1, st_size=10)
+            config.read_yaml_file_cached('/foo.yml')
+            mock_stat.return_value = mock.Mock(st_mtime_ns=2, st_size=10)
+            config.read_yaml_file_cached('/foo.yml')
+        self.assertEqual(mock_read.call_count, 2)
+
+    def test_read_yaml_file_cached_size_limit(self):
+        """The oldest entries should be evicted when the cache is full"""
+        with mock.patch('geospaas_harvesting.config._load_yaml_or_json_cache'), \
+             mock.patch('os.stat', return_value=mock.Mock(st_mtime_ns=1, st_size=10)), \
+             mock.patch('geospaas_harvesting.config.YAML_CACHE_SIZE', 2):
+            for path in ('/foo.yml', '/bar.yml', '/baz.yml'):
+                config.read_yaml_file_cached(path)
+        self.assertListEqual([key[0] for key in config._yaml_cache], ['/bar.yml', '/baz.yml'])
+
+
+class LoadYAMLOrJSONCacheTestCase(unittest.TestCase):
+    """Tests for the JSON cache of the configuration files"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.config_path = Path(self.temp_dir.name, 'config.yml')
+        self.config_path.write_text("---\nfoo: bar\nbaz: !ENV ENV_VAR\n", encoding='utf-8')
+        cache_dir_patcher = mock.patch('geospaas_harvesting.utils.CACHE_DIR',
+                                       os.path.join(self.temp_dir.name, 'cache'))
+        cache_dir_patcher.start()
+        self.addCleanup(cache_dir_patcher.stop)
+        self.cache_path = Path(utils.cache_file_path('config', self.config_path))
+
+    def test_write_cache(self):
+        """The cache file must be created, without the values of the
+        environment variables
+        """
+        with mock.patch('os.environ', {'ENV_VAR': 'secret'}):
+            self.assertDictEqual(config._load_yaml_or_json_cache(self.config_path),
+                                 {'foo': 'bar', 'baz': 'secret'})
+        self.assertDictEqual(json.loads(self.cache_path.read_text(encoding='utf-8'))['data'],
+                             {'foo': 'bar', 'baz': {'!ENV': 'ENV_VAR'}})
+
+    def test_read_cache(self):
+        """The YAML file must not be parsed if the cache is valid"""
+        config._load_yaml_or_json_cache(self.config_path)
+        with mock.patch('geospaas_harvesting.config.read_raw_yaml_file') as mock_read, \
+             mock.patch('os.environ', {'ENV_VAR': 'secret'}):
+            self.assertDictEqual(config._load_yaml_or_json_cache(self.config_path),
+                                 {'foo': 'bar', 'baz': 'secret'})
+        mock_read.assert_not_called()
+
+    def test_outdated_cache(self):
+        """The YAML file must be parsed again if it was modified"""
+        config._load_yaml_or_json_cache(self.config_path)
+        self.config_path.write_text("---\nfoo: qux\n", encoding='utf-8')
+        os.utime(self.config_path, ns=(0, 0))
+        self.assertDictEqual(config._load_yaml_or_json_cache(self.config_path), {'foo': 'qux'})
+
+    def test_outdated_cache_same_mtime(self):
+        """The YAML file must be parsed again if its size changed, even
+        if its modification time was kept
+        """
+        config._load_yaml_or_json_cache(self.config_path)
+        mtime_ns = self.config_path.stat().st_mtime_ns
+        self.config_path.write_text("---\nfoo: quux\n", encoding='utf-8')
+        os.utime(self.config_path, ns=(mtime_ns, mtime_ns))
+        self.assertDictEqual(config._load_yaml_or_json_cache(self.config_path), {'foo': 'quux'})
+
+    def test_cache_not_written_next_to_file(self):
+        """The cache must be written in the cache directory, not next
+        to the configuration file
+        """
+        config._load_yaml_or_json_cache(self.config_path)
+        self.assertTrue(self.cache_path.exists())
+        self.assertCountEqual(os.listdir(self.temp_dir.name), ['cache', 'config.yml'])
+
+    def test_cache_write_error(self):
+        """The temporary file must be removed if the cache can't be
+        written
+        """
+        with mock.patch('os.replace', side_effect=OSError), \
+             mock.patch('os.environ', {'ENV_VAR': 'secret'}):
+            self.assertDictEqual(config._load_yaml_or_json_cache(self.config_path),
+                                 {'foo': 'bar', 'baz': 'secret'})
+        self.assertListEqual(os.listdir(self.cache_path.parent), [])
+
+    def test_no_cache_for_non_json_data(self):
+        """The cache must not be written if the data can't be
+        represented as JSON
+        """
+        self.config_path.write_text("---\nfoo: 2023-01-01\n1: bar\n", encoding='utf-8')
+        self.assertDictEqual(config._load_yaml_or_json_cache(self.config_path),
+                             {'foo': date(2023, 1, 1), 1: 'bar'})
+        self.assertFalse(self.cache_path.exists())
+
+
+class ConfigImportTestCase(unittest.TestCase):
+    """Tests for the import of the config module"""
+
+    def test_no_provider_imported(self):
+        """Importing the config module must neither import the
+        provider modules nor the ingesters
+        """
+        imported_modules = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, geospaas_harvesting.config; '
+             'print(*[m for m in sys.modules if m.startswith("geospaas_harvesting")])'],
+            capture_output=True, check=True, text=True).stdout.split()
+        self.assertIn('geospaas_harvesting.providers.base', imported_modules)
+        self.assertNotIn('geospaas_harvesting.ingesters', imported_modules)
+        self.assertNotIn('geospaas_harvesting.providers.podaac', imported_modules)
+
+
 class ProvidersArgumentTestCase(unittest.TestCase):
     """Tests for the ProvidersArgument class"""
 
@@ -58,15 +200,118 @@ class ProvidersArgumentTestCase(unittest.TestCase):
                     name='cmems', username='user', password='pass'),
             })
 
+    def test_parse_does_not_pass_type(self):
+        """The 'type' setting must not be passed to the provider
+        constructor, and the configuration must not be modified
+        """
+        providers_arg = {'podaac': {'type': 'podaac', 'username': 'user'}}
+        with mock.patch.object(providers_podaac.PODAACProvider, '__init__',
+                               return_value=None) as mock_init:
+            config.ProvidersArgument('providers').parse(providers_arg)
+        mock_init.assert_called_once_with(name='podaac', username='user')
+        self.assertDictEqual(providers_arg, {'podaac': {'type': 'podaac', 'username': 'user'}})
+
     def test_parse_error(self):
         """Test error handling when parsing wrong configuration"""
         with self.assertLogs(config.logger, level=logging.ERROR):
             _ = config.ProvidersArgument('providers').parse({'foo': {}})
 
+    def test_parse_missing_provider_setting(self):
+        """An error must be logged if a setting required by the
+        provider class is missing, and the other providers must still
+        be created
+        """
+        with self.assertLogs(config.logger, level=logging.ERROR) as logs:
+            parsed_providers = config.ProvidersArgument('providers').parse({
+                'creodias': {'type': 'resto'},
+                'podaac': {'type': 'podaac'},
+            })
+        self.assertIn("Missing setting for provider 'creodias': url", logs.output[0])
+        self.assertDictEqual(parsed_providers,
+                             {'podaac': providers_podaac.PODAACProvider(name='podaac')})
+
+    def test_parse_unknown_type(self):
+        """An error must be logged if the provider type is unknown"""
+        with self.assertLogs(config.logger, level=logging.ERROR):
+            self.assertDictEqual(
+                config.ProvidersArgument('providers').parse({'foo': {'type': 'bar'}}),
+                {})
+
+    def test_find_provider(self):
+        """The provider classes must be found from their type"""
+        self.assertIs(config.ProvidersArgument._find_provider('podaac'),
+                      providers_podaac.PODAACProvider)
+
+    def test_find_provider_imports_module(self):
+        """The module defining the provider must be imported when the
+        provider is looked up
+        """
+        with mock.patch('importlib.import_module') as mock_import:
+            config.ProvidersArgument._find_provider('cmems')
+        mock_import.assert_called_once_with('geospaas_harvesting.providers.cmems')
+
+    def test_import_provider_modules(self):
+        """The modules which are not imported yet must be imported in
+        parallel
+        """
+        with mock.patch.dict(config.ProvidersArgument.provider_modules,
+                             {'foo': 'foo_module', 'bar': 'bar_module', 'baz': 'baz_module'}), \
+             mock.patch('concurrent.futures.ThreadPoolExecutor',
+                        wraps=concurrent.futures.ThreadPoolExecutor) as mock_executor, \
+             mock.patch('importlib.import_module') as mock_import:
+            config.ProvidersArgument._import_provider_modules(['foo', 'bar', 'podaac', 'qux'])
+        mock_executor.assert_called_once_with(max_workers=2)
+        mock_import.assert_has_calls(
+            (mock.call('foo_module'), mock.call('bar_module')), any_order=True)
+        self.assertEqual(mock_import.call_count, 2)
+
+    def test_import_provider_modules_error(self):
+        """Import errors must be logged but not raised when preloading
+        modules
+        """
+        with mock.patch.dict(config.ProvidersArgument.provider_modules,
+                             {'foo': 'foo_module', 'bar': 'bar_module'}), \
+             mock.patch('importlib.import_module', side_effect=ImportError('error')), \
+             self.assertLogs(config.logger, level=logging.DEBUG) as logs_cm:
+            config.ProvidersArgument._import_provider_modules(['foo', 'bar'])
+        self.assertCountEqual(logs_cm.output, [
+            "DEBUG:geospaas_harvesting.config:Could not import 'foo_module': error",
+            "DEBUG:geospaas_harvesting.config:Could not import 'bar_module': error",
+        ])
+
+    def test_import_provider_modules_other_error(self):
+        """Errors other than import errors must be raised when
+        preloading modules
+        """
+        with mock.patch.dict(config.ProvidersArgument.provider_modules,
+                             {'foo': 'foo_module', 'bar': 'bar_module'}), \
+             mock.patch('importlib.import_module', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                config.ProvidersArgument._import_provider_modules(['foo', 'bar'])
+
+    def test_provider_modules(self):
+        """All the built-in provider types must be available"""
+        for provider_type in config.ProvidersArgument.provider_modules:
+            with self.subTest(provider_type):
+                self.assertEqual(
+                    config.ProvidersArgument._find_provider(provider_type).provider_type,
+                    provider_type)
+
 
 class ProvidersConfigurationTestCase(unittest.TestCase):
     """Tests for the ProvidersConfiguration class"""
 
+    def test_slots(self):
+        """Configuration objects must not have a __dict__"""
+        for configuration_class in (config.ProvidersConfiguration, config.SearchConfiguration):
+            with self.subTest(configuration_class):
+                self.assertFalse(hasattr(configuration_class(), '__dict__'))
+
+    def test_shared_arguments_parser(self):
+        """The arguments parser must not be rebuilt for each instance"""
+        self.assertIs(config.ProvidersConfiguration().config_arguments_parser,
+                      config.ProvidersConfiguration().config_arguments_parser)
+
     def test_parse_providers_config(self):
         """Test parsing a providers configuration file"""
         with mock.patch('geospaas_harvesting.utils.http_request'):
@@ -107,6 +352,14 @@ class SearchConfigurationTestCase(unittest.TestCase):
         }])
         self.assertEqual(self.search_config.providers, self.providers_config.providers)
 
+    def test_no_provider_instantiated(self):
+        """Creating a SearchConfiguration must not instantiate a
+        Provider
+        """
+        with mock.patch('geospaas_harvesting.providers.base.Provider.__init__') as mock_init:
+            config.SearchConfiguration()
+        mock_init.assert_not_called()
+
     def test_with_provider_error(self):
         """An exception must be raised if the argument to
         with_providers() is not a ProvidersConfiguration object
@@ -114,6 +367,11 @@ class SearchConfigurationTestCase(unittest.TestCase):
         with self.assertRaises(ValueError):
             config.SearchConfiguration().with_providers('foo')
 
+    def test_with_providers_mapping(self):
+        """Any mapping must be accepted by with_providers()"""
+        providers = types.MappingProxyType(self.providers_config.providers)
+        self.assertIs(config.SearchConfiguration().with_providers(providers).providers, providers)
+
     def test_create_provider_searches(self):
         """Test starting searches from a SearchConfiguration object
         """
@@ -126,3 +384,68 @@ class SearchConfigurationTestCase(unittest.TestCase):
             processingLevel='2',
             start_time='2023-01-01',
             end_time='2023-01-02')
+
+    def test_create_provider_searches_with_common(self):
+        """The common search parameters must be merged with the
+        provider specific ones, which take precedence
+        """
+        self.search_config.common = {'start_time': '2022-01-01', 'end_time': '2022-01-02'}
+        with mock.patch('geospaas_harvesting.providers.resto.RestoProvider.search') as mock_search:
+            self.search_config.create_provider_searches()
+        mock_search.assert_called_once_with(
+            collection='SENTINEL-3',
+            processingLevel='2',
+            start_time='2023-01-01',
+            end_time='2023-01-02')
+        self.assertDictEqual(self.search_config.common,
+                             {'start_time': '2022-01-01', 'end_time': '2022-01-02'})
+
+    def test_create_provider_searches_twice(self):
+        """The searches configuration must not be modified, so that
+        the searches can be created again
+        """
+        with mock.patch('geospaas_harvesting.providers.resto.RestoProvider.search') as mock_search:
+            self.search_config.create_provider_searches()
+            self.search_config.create_provider_searches()
+        self.assertEqual(mock_search.call_count, 2)
+        self.assertEqual(self.search_config.searches[0]['provider_name'], 'creodias')
+
+    def test_create_provider_searches_duplicates(self):
+        """Identical searches must only be created once, and the
+        duplicates must be dropped
+        """
+        self.search_config.common = {'ingester': {'max_fetcher_threads': 1}}
+        self.search_config.searches.append(self.search_config.searches[0].copy())
+        with mock.patch('geospaas_harvesting.providers.resto.RestoProvider.search') as mock_search, \
+             self.assertLogs(config.logger, level=logging.WARNING) as logs_cm:
+            searches = self.search_config.create_provider_searches()
+        mock_search.assert_called_once()
+        self.assertListEqual(searches, [mock_search.return_value])
+        self.assertEqual(len(logs_cm.records), 1)
+        self.assertTrue(logs_cm.records[0].getMessage().startswith(
+            "Skipping duplicate search for provider 'creodias'"))
+
+    def test_create_provider_searches_unhashable(self):
+        """Searches which contain unhashable values must still be
+        created
+        """
+        self.search_config.common = {'foo': {'bar': set()}}
+        self.search_config.searches.append(self.search_config.searches[0].copy())
+        with mock.patch('geospaas_harvesting.providers.resto.RestoProvider.search') as mock_search:
+            self.search_config.create_provider_searches()
+        self.assertEqual(mock_search.call_count, 2)
+
+
+class FreezeTestCase(unittest.TestCase):
+    """Tests for the _freeze() function"""
+
+    def test_freeze(self):
+        """Nested dictionaries and lists must be made hashable"""
+        self.assertEqual(
+            config._freeze({'a': [1, {'b': 2}], 'c': 'd'}),
+            frozenset({('a', (1, frozenset({('b', 2)}))), ('c', 'd')}))
+
+    def test_freeze_unhashable(self):
+        """A TypeError must be raised for unhashable values"""
+        with self.assertRaises(TypeError):
+            config._freeze({'a': set()})
@@ -1,6 +1,7 @@
 """Test suite for crawlers"""
 # pylint: disable=protected-access
 
+import concurrent.futures
 import ftplib
 import io
 import logging
@@ -10,11 +11,12 @@ import re
 import shutil
 import tempfile
 import threading
+import time
 import unittest
 import unittest.mock as mock
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
-from urllib.parse import ParseResult
+from urllib.parse import ParseResult, urljoin
 
 import requests
 
@@ -46,6 +48,32 @@ class DatasetInfoTestCase(unittest.TestCase):
             repr(crawlers.DatasetInfo('https://foo', {'a': 1})),
             "DatasetInfo(url='https://foo', metadata={'a': 1})")
 
+    def test_hash(self):
+        """DatasetInfo objects with the same URL must have the same
+        hash
+        """
+        self.assertEqual(
+            len({crawlers.DatasetInfo('foo'), crawlers.DatasetInfo('foo'),
+                 crawlers.DatasetInfo('bar')}),
+            2)
+        self.assertEqual(hash(crawlers.DatasetInfo('foo', {'a': 1})),
+                         hash(crawlers.DatasetInfo('foo')))
+
+    def test_slots(self):
+        """DatasetInfo objects must not have a __dict__"""
+        self.assertFalse(hasattr(crawlers.DatasetInfo('foo'), '__dict__'))
+
+    def test_pickling(self):
+        """DatasetInfo objects must be picklable, and objects pickled
+        with a __dict__ must still be loadable
+        """
+        dataset_info = crawlers.DatasetInfo('foo', {'bar': 'baz'})
+        self.assertEqual(pickle.loads(pickle.dumps(dataset_info)), dataset_info)
+
+        old_dataset_info = crawlers.DatasetInfo.__new__(crawlers.DatasetInfo)
+        old_dataset_info.__setstate__({'url': 'foo', 'metadata': {'bar': 'baz'}})
+        self.assertEqual(old_dataset_info, dataset_info)
+
 
 class BaseCrawlerTestCase(unittest.TestCase):
     """Tests for the base Crawler"""
@@ -78,6 +106,7 @@ class BaseCrawlerTestCase(unittest.TestCase):
         http_500_error.response = mock.MagicMock(status_code=500)
 
         with mock.patch('geospaas_harvesting.utils.http_request') as mock_request, \
+                mock.patch('random.uniform', return_value=0), \
                 mock.patch('time.sleep') as mock_sleep:
             mock_request.side_effect=(
                 requests.ConnectionError,
@@ -91,6 +120,51 @@ class BaseCrawlerTestCase(unittest.TestCase):
             self.assertEqual(len(mock_request.mock_calls), 5)
             self.assertListEqual(mock_sleep.mock_calls, [mock.call(30 * (2**i)) for i in range(4)])
 
+    def test_get_retry_wait_time(self):
+        """The wait time must include a jitter, unless the server
+        provides a Retry-After header
+        """
+        with mock.patch('random.uniform', return_value=0.5) as mock_uniform:
+            self.assertEqual(
+                crawlers.Crawler._get_retry_wait_time(requests.ConnectionError(), 10), 10.5)
+        mock_uniform.assert_called_once_with(0, 1)
+
+        response = requests.Response()
+        response.headers['Retry-After'] = '120'
+        self.assertEqual(
+            crawlers.Crawler._get_retry_wait_time(requests.HTTPError(response=response), 10),
+            120)
+
+        response.headers['Retry-After'] = 'foo'
+        self.assertLessEqual(
+            crawlers.Crawler._get_retry_wait_time(requests.HTTPError(response=response), 10),
+            11)
+
+    def test_http_get_uses_session(self):
+        """The requests must be sent through the crawler's session,
+        which is created once
+        """
+        crawler = crawlers.Crawler(max_threads=4)
+        with mock.patch('geospaas_harvesting.utils.http_request') as mock_request:
+            crawler._http_get('url')
+            crawler._http_get('url')
+        session = crawler._get_session()
+        self.assertIsInstance(session, crawlers.utils.TrustDomainSession)
+        mock_request.assert_has_calls(
+            (mock.call('GET', 'url', session=session, timeout=crawler.REQUEST_TIMEOUT),) * 2,
+            any_order=True)
+        self.assertEqual(session.get_adapter('https://foo')._pool_maxsize, 8)
+
+    def test_http_get_timeout(self):
+        """A default timeout must be set on the requests, unless one is
+        given in the request parameters
+        """
+        crawler = crawlers.Crawler()
+        with mock.patch('geospaas_harvesting.utils.http_request') as mock_request:
+            crawler._http_get('url', request_parameters={'timeout': 5, 'stream': True})
+        mock_request.assert_called_once_with(
+            'GET', 'url', session=crawler._get_session(), timeout=5, stream=True)
+
     def test_http_get_fails_eventually(self):
         """Test that _http_get retries the request when a connection
         error or a server error occurs, then logs an error and returns None
@@ -205,6 +279,78 @@ class CrawlerIteratorTestCase(unittest.TestCase):
         self.assertEqual(len(failed_ingestion_files), 1)
         self.assertTrue(failed_ingestion_files[0].endswith(crawler_iterator.RECOVERY_SUFFIX))
 
+    def test_iterating_batches(self):
+        """Results must be passed to the consumer in batches, and all
+        of them must be returned
+        """
+        class ManyResultsCrawler(crawlers.Crawler):
+            """Crawler which returns more results than the batch size"""
+            def crawl(self):
+                for i in range(10):
+                    yield crawlers.DatasetInfo(f"https://foo/{i}")
+
+            def set_initial_state(self):
+                pass
+
+            def get_normalized_attributes(self, dataset_info, **kwargs):
+                return {}
+
+        with mock.patch.object(crawlers.CrawlerIterator, 'BATCH_SIZE', 4), \
+             mock.patch.object(crawlers.CrawlerIterator, '_put_result',
+                               autospec=True, side_effect=crawlers.CrawlerIterator._put_result) as mock_put:
+            crawler_iterator = iter(ManyResultsCrawler(max_threads=2))
+            results = list(crawler_iterator)
+
+        self.assertEqual(mock_put.call_count, 10)
+        self.assertCountEqual([result.url for result in results],
+                              [f"https://foo/{i}" for i in range(10)])
+
+    def test_put_result(self):
+        """A batch must be put in the queue when it is full"""
+        with mock.patch('threading.Thread'):
+            crawler_iterator = iter(self.TestCrawler())
+        with mock.patch.object(crawler_iterator, 'BATCH_SIZE', 2):
+            crawler_iterator._put_result(1)
+            self.assertTrue(crawler_iterator._results.empty())
+            crawler_iterator._put_result(2)
+            crawler_iterator._put_result(3)
+        self.assertListEqual(crawler_iterator._results.get_nowait(), [1, 2])
+        crawler_iterator._flush_batch()
+        self.assertListEqual(crawler_iterator._results.get_nowait(), [3])
+        crawler_iterator._flush_batch()
+        self.assertTrue(crawler_iterator._results.empty())
+
+    def test_results_available_before_end_of_crawl(self):
+        """When the crawler is slower than the normalizing threads,
+        the results must be handed over without waiting for the batch
+        to be full or for the crawl to end
+        """
+        crawl_can_end = threading.Event()
+
+        class SlowCrawler(crawlers.Crawler):
+            """Crawler which waits before returning its last result"""
+            def crawl(self):
+                yield crawlers.DatasetInfo('https://foo/1')
+                yield crawlers.DatasetInfo('https://foo/2')
+                crawl_can_end.wait(30)
+                yield crawlers.DatasetInfo('https://foo/3')
+
+            def set_initial_state(self):
+                pass
+
+            def get_normalized_attributes(self, dataset_info, **kwargs):
+                return {}
+
+        crawler_iterator = iter(SlowCrawler(max_threads=2))
+        start = time.monotonic()
+        try:
+            self.assertCountEqual([next(crawler_iterator).url, next(crawler_iterator).url],
+                                  ['https://foo/1', 'https://foo/2'])
+            self.assertLess(time.monotonic() - start, 10)
+        finally:
+            crawl_can_end.set()
+        self.assertListEqual([result.url for result in crawler_iterator], ['https://foo/3'])
+
     def test_pickle_list_elements(self):
         """Test pickling a list of objects"""
         # create a crawler iterator without starting the processing threads
@@ -217,15 +363,12 @@ class CrawlerIteratorTestCase(unittest.TestCase):
             # pickle various objects to a temporary file
             crawler_iterator._pickle_list_elements(objects_to_pickle, file_path)
 
-            # retrieve the pickled objects and check they are the same
-            # as the ones which were pickled
-            unpickled_objects = []
+            # retrieve the pickled list and check it contains the
+            # objects which were pickled
             with open(file_path, 'rb') as pickle_file:
-                while True:
-                    try:
-                        unpickled_objects.append(pickle.load(pickle_file))
-                    except EOFError:
-                        break
+                unpickled_objects = pickle.load(pickle_file)
+                with self.assertRaises(EOFError):
+                    pickle.load(pickle_file)
 
             self.assertListEqual(unpickled_objects, reference)
             self.assertFalse(objects_to_pickle)  # check that the list has been cleared
@@ -258,10 +401,9 @@ class CrawlerIteratorTestCase(unittest.TestCase):
         failed_dir_contents = os.listdir(self.tmp_dir)
         self.assertEqual(len(failed_dir_contents), 1)
 
+        # one list is pickled for each dump
         with open(os.path.join(self.tmp_dir, failed_dir_contents[0]), 'rb') as pickle_file:
-            pickled_objects = [
-                pickle.load(pickle_file) for _ in range(len(items_to_pickle))
-            ]
+            pickled_objects = pickle.load(pickle_file) + pickle.load(pickle_file)
 
             with self.assertRaises(EOFError):
                 pickle.load(pickle_file)
@@ -286,13 +428,53 @@ class CrawlerIteratorTestCase(unittest.TestCase):
         """Test that keyboard interrupts are managed properly"""
         mock_futures = (mock.Mock(), KeyboardInterrupt)
         with mock.patch('concurrent.futures.ThreadPoolExecutor.submit',
-                        side_effect=mock_futures) as mock_submit, \
-             mock.patch('concurrent.futures.as_completed') as mock_as_completed:
+                        side_effect=mock_futures) as mock_submit:
             with self.assertLogs(crawlers.CrawlerIterator.logger, level=logging.DEBUG):
                 crawler_iterator = iter(self.TestCrawler())
                 crawler_iterator.manager_thread.join()
             mock_futures[0].cancel.assert_called()
 
+    def test_in_flight_datasets_limit(self):
+        """The crawler must not get further ahead of the normalizing
+        threads than max_threads * IN_FLIGHT_PER_THREAD datasets
+        """
+        crawled = []
+        unblock = threading.Event()
+
+        class BlockingCrawler(self.TestCrawler):
+            """Crawler whose normalization blocks until told otherwise"""
+            def crawl(self):
+                for i in range(10):
+                    crawled.append(i)
+                    yield crawlers.DatasetInfo(f"https://foo/{i}")
+
+            def get_normalized_attributes(self, dataset_info, **kwargs):
+                unblock.wait()
+                return {}
+
+        with mock.patch.object(crawlers.CrawlerIterator, 'IN_FLIGHT_PER_THREAD', 2):
+            crawler_iterator = crawlers.CrawlerIterator(BlockingCrawler(), max_threads=1)
+            time.sleep(0.1)
+            # two datasets are submitted, the third one waits for a slot
+            self.assertEqual(len(crawled), 3)
+            unblock.set()
+            self.assertEqual(len(list(crawler_iterator)), 10)
+        self.assertFalse(crawler_iterator._pending)
+
+    def test_normalizing_done_logs_exception(self):
+        """_normalizing_done() should log the exceptions raised in the
+        normalizing threads
+        """
+        with mock.patch('threading.Thread'):
+            crawler_iterator = iter(self.TestCrawler())
+        future = concurrent.futures.Future()
+        future.set_exception(RuntimeError('foo'))
+        crawler_iterator._in_flight.acquire()
+        crawler_iterator._pending.add(future)
+        with self.assertLogs(crawler_iterator.logger, level=logging.ERROR):
+            crawler_iterator._normalizing_done(future)
+        self.assertFalse(crawler_iterator._pending)
+
 
 class DirectoryCrawlerTestCase(unittest.TestCase):
     """Tests for the DirectoryCrawler"""
@@ -386,6 +568,20 @@ class DirectoryCrawlerTestCase(unittest.TestCase):
         crawler = crawlers.DirectoryCrawler('https://foo')
         self.assertEqual(crawler.get_download_url('bar'), 'https://foo/bar')
 
+    def test_get_download_url_absolute_paths(self):
+        """get_download_url() should give the same results as urljoin()
+        for absolute paths
+        """
+        crawler = crawlers.DirectoryCrawler('https://foo/bar')
+        for path in ('/bar/baz.nc', '/bar/../baz.nc', '/bar/./baz.nc', '//qux/baz.nc'):
+            self.assertEqual(crawler.get_download_url(path),
+                             urljoin('https://foo', path))
+
+    def test_get_download_url_local_path(self):
+        """get_download_url() should return local paths unchanged"""
+        crawler = crawlers.DirectoryCrawler('/foo')
+        self.assertEqual(crawler.get_download_url('/foo/bar.nc'), '/foo/bar.nc')
+
     def test_base_url(self):
         """The base_url property should return the root_url without path"""
         crawler = crawlers.DirectoryCrawler('http://foo/bar')
@@ -399,6 +595,8 @@ class DirectoryCrawlerTestCase(unittest.TestCase):
         crawler.set_initial_state()
         self.assertListEqual(crawler._results, [])
         self.assertListEqual(crawler._to_process, ['/bar'])
+        self.assertSetEqual(crawler._results_seen, set())
+        self.assertSetEqual(crawler._to_process_seen, {'/bar'})
 
     def test_add_url_to_return(self):
         """
@@ -420,6 +618,28 @@ class DirectoryCrawlerTestCase(unittest.TestCase):
         crawler._add_folder_to_process('/bar/baz')
         self.assertListEqual(crawler._to_process, ['/bar/baz'])
 
+    def test_add_url_to_return_once(self):
+        """A URL must only be returned once, even if it was already
+        popped from the results list
+        """
+        crawler = crawlers.DirectoryCrawler('http://foo/bar')
+        crawler.logger = mock.Mock()
+        crawler._add_url_to_return('/bar/baz.nc')
+        crawler._add_url_to_return('/bar/baz.nc')
+        self.assertListEqual(crawler._results, [crawlers.DatasetInfo('http://foo/bar/baz.nc')])
+        crawler._results.pop()
+        crawler._add_url_to_return('/bar/baz.nc')
+        self.assertListEqual(crawler._results, [])
+
+    def test_add_folder_to_process_once(self):
+        """A folder must only be added once to the folders to process"""
+        crawler = crawlers.DirectoryCrawler('http://foo/bar')
+        crawler.logger = mock.Mock()
+        crawler._add_folder_to_process('/bar/baz')
+        crawler._add_folder_to_process('/bar/baz')
+        crawler._add_folder_to_process('/bar')
+        self.assertListEqual(crawler._to_process, ['/bar', '/bar/baz'])
+
     def test_process_folder_with_file(self):
         """_process_folder() should feed the _urls stack
         with only file paths which are included
@@ -509,6 +729,88 @@ class DirectoryCrawlerTestCase(unittest.TestCase):
             (None, None)
         )
 
+    def test_folder_coverage_cache(self):
+        """The coverage of a given path must only be computed once"""
+        class TestCrawler(crawlers.DirectoryCrawler):
+            """Crawler class used to get a separate cache entry"""
+
+        with mock.patch.object(TestCrawler, 'DAY_OF_MONTH_MATCHER') as mock_matcher:
+            mock_matcher.match.return_value = None
+            for _ in range(2):
+                self.assertEqual(
+                    TestCrawler._folder_coverage('https://test-opendap.com/folder/2019'),
+                    (datetime(2019, 1, 1, tzinfo=timezone.utc),
+                     datetime(2020, 1, 1, tzinfo=timezone.utc)))
+        mock_matcher.match.assert_called_once_with('https://test-opendap.com/folder/2019')
+
+    def test_folder_coverage_no_year(self):
+        """The matchers must not be tried on paths which do not
+        contain a year
+        """
+        class TestCrawler(crawlers.DirectoryCrawler):
+            """Crawler class used to get a separate cache entry"""
+
+        with mock.patch.object(TestCrawler, 'DAY_OF_MONTH_MATCHER') as mock_matcher:
+            self.assertEqual(
+                TestCrawler._folder_coverage('https://test-opendap.com/folder/046/bar.nc'),
+                (None, None))
+        mock_matcher.match.assert_not_called()
+
+    def test_folder_coverage_timestamps(self):
+        """The timestamps must match the coverage returned by
+        _folder_coverage()
+        """
+        for path in ('https://test-opendap.com/folder/2019/contents.html',
+                     'https://test-opendap.com/folder/2020/contents.html',
+                     'https://test-opendap.com/folder/2019/02/contents.html',
+                     'https://test-opendap.com/folder/2020/12/contents.html',
+                     'https://test-opendap.com/folder/20190214/contents.html',
+                     'https://test-opendap.com/folder/2019/046/contents.html',
+                     'https://test-opendap.com/folder/2020/366/contents.html'):
+            with self.subTest(path=path):
+                start, stop = crawlers.DirectoryCrawler._folder_coverage(path)
+                self.assertEqual(
+                    crawlers.DirectoryCrawler._folder_coverage_timestamps(path),
+                    (start.timestamp(), stop.timestamp()))
+        self.assertEqual(
+            crawlers.DirectoryCrawler._folder_coverage_timestamps(
+                'https://test-opendap.com/folder/contents.html'),
+            (None, None))
+
+    def test_time_range_timestamps(self):
+        """The time range limits should be converted to timestamps,
+        naive datetimes being considered as UTC
+        """
+        crawler = crawlers.DirectoryCrawler(
+            '', time_range=(datetime(2019, 2, 14), datetime(2019, 2, 20, tzinfo=timezone.utc)))
+        self.assertEqual(crawler._time_range_timestamps, (1550102400., 1550620800.))
+        crawler.time_range = (None, None)
+        self.assertEqual(crawler._time_range_timestamps, (float('-inf'), float('inf')))
+
+    def test_intersects_time_range_timestamps(self):
+        """Test the behavior of `_intersects_time_range_timestamps`"""
+        crawler = crawlers.DirectoryCrawler(
+            '', time_range=(datetime(2019, 2, 14), datetime(2019, 2, 20)))
+
+        def ts(*args):
+            return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+        self.assertTrue(crawler._intersects_time_range_timestamps(
+            ts(2019, 2, 10), ts(2019, 2, 14)))
+        self.assertTrue(crawler._intersects_time_range_timestamps(
+            ts(2019, 2, 20), ts(2019, 2, 25)))
+        self.assertTrue(crawler._intersects_time_range_timestamps(None, ts(2019, 2, 15)))
+        self.assertTrue(crawler._intersects_time_range_timestamps(None, None))
+        self.assertFalse(crawler._intersects_time_range_timestamps(
+            ts(2019, 2, 10), ts(2019, 2, 13)))
+        self.assertFalse(crawler._intersects_time_range_timestamps(
+            ts(2019, 2, 25), ts(2019, 2, 26)))
+        self.assertFalse(crawler._intersects_time_range_timestamps(ts(2019, 2, 21), None))
+
+        crawler.time_range = (None, None)
+        self.assertTrue(crawler._intersects_time_range_timestamps(
+            ts(2019, 2, 10), ts(2019, 2, 13)))
+
     def test_intersects_time_range_finite_limits(self):
         """
         Test the behavior of the `_intersects_time_range` method with a finite time range limitation
@@ -627,6 +929,71 @@ class DirectoryCrawlerTestCase(unittest.TestCase):
                 next(generator)
             mock_process_folder.assert_called()
 
+    def test_crawl_in_threads(self):
+        """When max_threads is greater than 1, the folders must be
+        processed in threads and all the resources must be returned
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            expected = []
+            for folder in ('a', 'b', os.path.join('b', 'c')):
+                os.mkdir(os.path.join(tmp_dir, folder))
+                for i in range(3):
+                    file_path = os.path.join(tmp_dir, folder, f"{i}.nc")
+                    open(file_path, 'w').close()
+                    expected.append(crawlers.DatasetInfo(file_path))
+
+            crawler = crawlers.LocalDirectoryCrawler(tmp_dir, include=r'\.nc$', max_threads=4)
+            with mock.patch.object(crawler, '_process_folder',
+                                   wraps=crawler._process_folder) as mock_process_folder:
+                self.assertCountEqual(list(crawler.crawl()), expected)
+            self.assertEqual(mock_process_folder.call_count, 4)
+
+    def test_crawl_in_threads_host_limit(self):
+        """No more than PER_HOST_CONCURRENCY folders must be processed
+        at the same time on a host, even by separate crawlers
+        """
+        lock = threading.Lock()
+        counts = {'current': 0, 'max': 0}
+
+        def process_folder(folder_path):
+            with lock:
+                counts['current'] += 1
+                counts['max'] = max(counts['max'], counts['current'])
+            time.sleep(0.01)
+            with lock:
+                counts['current'] -= 1
+
+        class TestCrawler(crawlers.DirectoryCrawler):
+            """Crawler class with its own semaphores"""
+            PER_HOST_CONCURRENCY = 2
+            _host_semaphores = {}
+
+        crawler1 = TestCrawler('https://foo/bar', max_threads=4)
+        crawler2 = TestCrawler('https://foo/baz', max_threads=4)
+        self.assertIs(crawler1._get_host_semaphore(), crawler2._get_host_semaphore())
+        self.assertIsNot(crawler1._get_host_semaphore(),
+                         TestCrawler('https://qux', max_threads=4)._get_host_semaphore())
+
+        threads = []
+        for crawler in (crawler1, crawler2):
+            crawler._to_process = [f"/bar/{i}" for i in range(5)]
+            crawler._process_folder = process_folder
+            threads.append(threading.Thread(target=lambda c=crawler: list(c.crawl())))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counts['max'], 2)
+
+    def test_crawl_in_threads_error(self):
+        """Errors which occur while processing a folder in a thread
+        must be raised
+        """
+        crawler = crawlers.DirectoryCrawler('https://foo/bar', max_threads=2)
+        with mock.patch.object(crawler, '_process_folder', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                list(crawler.crawl())
+
 
 class LocalDirectoryCrawlerTestCase(unittest.TestCase):
     """Tests for LocalDirectoryCrawler"""
@@ -637,11 +1004,17 @@ class LocalDirectoryCrawlerTestCase(unittest.TestCase):
     def test_list_folder_contents(self):
         """_list_folder_contents() should return the absolute
         path of all files contained in the folder"""
-        with mock.patch('os.listdir', return_value=['foo', 'bar', 'baz']), \
+        base_dir_name = 'base_dir'
+        entries = []
+        for name in ('foo', 'bar', 'baz'):
+            entry = mock.Mock(path=os.path.join(base_dir_name, name))
+            entry.is_dir.return_value = False
+            entries.append(entry)
+        with mock.patch('os.scandir') as mock_scandir, \
                 mock.patch.object(self.crawler, '_is_folder', return_value=True):
-            base_dir_name = 'base_dir'
+            mock_scandir.return_value.__enter__.return_value = entries
             self.assertListEqual(
-                self.crawler._list_folder_contents(base_dir_name),
+                list(self.crawler._list_folder_contents(base_dir_name)),
                 [
                     os.path.join(base_dir_name, 'foo'),
                     os.path.join(base_dir_name, 'bar'),
@@ -656,7 +1029,7 @@ class LocalDirectoryCrawlerTestCase(unittest.TestCase):
         with mock.patch.object(self.crawler, '_is_folder', return_value=False):
             file_path = '/foo/bar.nc'
             self.assertListEqual(
-                self.crawler._list_folder_contents(file_path),
+                list(self.crawler._list_folder_contents(file_path)),
                 [file_path]
             )
 
@@ -668,6 +1041,21 @@ class LocalDirectoryCrawlerTestCase(unittest.TestCase):
         with mock.patch('os.path.isdir', return_value=False):
             self.assertFalse(self.crawler._is_folder(''), "_is_folder() should return False")
 
+    def test_is_folder_listed_path(self):
+        """_is_folder() should not stat the paths which were found
+        while listing a folder
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.mkdir(os.path.join(tmp_dir, 'foo'))
+            open(os.path.join(tmp_dir, 'bar.nc'), 'w').close()
+            contents = list(self.crawler._list_folder_contents(tmp_dir))
+            with mock.patch('os.path.isdir') as mock_isdir:
+                self.assertTrue(self.crawler._is_folder(os.path.join(tmp_dir, 'foo')))
+                self.assertFalse(self.crawler._is_folder(os.path.join(tmp_dir, 'bar.nc')))
+                mock_isdir.assert_not_called()
+        self.assertCountEqual(
+            contents, [os.path.join(tmp_dir, 'foo'), os.path.join(tmp_dir, 'bar.nc')])
+
     def test_abstract_get_normalized_attributes(self):
         """get_normalized_attributes is abstract in LocalDirectoryCrawler"""
         with self.assertRaises(NotImplementedError):
@@ -702,6 +1090,45 @@ class HTMLDirectoryCrawlerTestCase(unittest.TestCase):
             html = data_file.read()
         self.assertEqual(len(crawlers.HTMLDirectoryCrawler._get_links(html)), 0)
 
+    def test_get_links_reuses_parser(self):
+        """The same parser must be used for successive pages in a
+        thread, without leaking state from one page to the next
+        """
+        with mock.patch('geospaas_harvesting.crawlers.LinkExtractor',
+                        wraps=crawlers.LinkExtractor) as mock_extractor, \
+             mock.patch.object(crawlers.HTMLDirectoryCrawler, '_link_extractors',
+                               threading.local()), \
+             mock.patch('geospaas_harvesting.crawlers.lxml', None):
+            self.assertListEqual(
+                crawlers.HTMLDirectoryCrawler._get_links('<a href="foo">foo</a><a href="ba'),
+                ['foo'])
+            self.assertListEqual(
+                crawlers.HTMLDirectoryCrawler._get_links('<a href="bar">bar</a>'),
+                ['bar'])
+        mock_extractor.assert_called_once_with()
+
+    @unittest.skipIf(crawlers.lxml is None, 'lxml is not installed')
+    def test_get_links_lxml(self):
+        """lxml and LinkExtractor must find the same links"""
+        with open(os.path.join(
+                os.path.dirname(__file__), 'data', 'opendap', 'root.html')) as data_file:
+            html = data_file.read()
+        links = crawlers.HTMLDirectoryCrawler._get_links_lxml(html)
+        with mock.patch('geospaas_harvesting.crawlers.lxml', None):
+            self.assertListEqual(links, crawlers.HTMLDirectoryCrawler._get_links(html))
+        self.assertListEqual(crawlers.HTMLDirectoryCrawler._get_links_lxml(''), [])
+
+    @unittest.skipIf(crawlers.lxml is None, 'lxml is not installed')
+    def test_get_links_encoding_declaration(self):
+        """The encoding declared in the page must not prevent lxml from
+        parsing the already decoded page
+        """
+        self.assertListEqual(
+            crawlers.HTMLDirectoryCrawler._get_links_lxml(
+                '<?xml version="1.0" encoding="ISO-8859-1"?>'
+                '<html><a href="f\u00f8\u00f6">foo</a></html>'),
+            ['f\u00f8\u00f6'])
+
     def test_link_extractor_error(self):
         """In case of error, LinkExtractor must use a logger"""
         parser = crawlers.LinkExtractor()
@@ -719,6 +1146,38 @@ class HTMLDirectoryCrawlerTestCase(unittest.TestCase):
             ['/foo/bar', '/foo/baz']
         )
 
+    def test_get_page_text(self):
+        """The encoding of pages which do not declare it should not be
+        guessed
+        """
+        response = requests.Response()
+        response._content = '<a href="é.nc"></a>'.encode('utf-8')
+        with mock.patch.object(requests.Response, 'apparent_encoding',
+                               new_callable=mock.PropertyMock) as mock_apparent_encoding:
+            self.assertEqual(crawlers.HTMLDirectoryCrawler._get_page_text(response),
+                             '<a href="é.nc"></a>')
+        mock_apparent_encoding.assert_not_called()
+
+    def test_get_page_text_declared_encoding(self):
+        """The encoding declared by the server should be used"""
+        response = requests.Response()
+        response._content = '<a href="é.nc"></a>'.encode('latin-1')
+        response.headers['Content-Type'] = 'text/html; charset=ISO-8859-1'
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        self.assertEqual(crawlers.HTMLDirectoryCrawler._get_page_text(response),
+                         '<a href="é.nc"></a>')
+
+    def test_prepend_parent_path_urljoin(self):
+        """The result must be the same as urljoin() for all kinds of
+        links
+        """
+        parent_path = '/foo/'
+        paths = ['baz.nc', 'bar/', 'bar/baz.nc?qux=1', '#quux', '', '../bar', './bar', 'bar/../baz',
+                 'bar/./baz', '/bar', '//host/bar', 'http://host/bar', 'mailto:foo@bar', '.hidden']
+        self.assertListEqual(
+            crawlers.HTMLDirectoryCrawler._prepend_parent_path(parent_path, paths),
+            [urljoin(parent_path, path) for path in paths])
+
     def test_list_folder_contents(self):
         """Test listing a folder's contents"""
         with mock.patch('geospaas_harvesting.crawlers.Crawler._http_get') as mock_http_get:
@@ -732,6 +1191,106 @@ class HTMLDirectoryCrawlerTestCase(unittest.TestCase):
                 crawler._list_folder_contents('/foo/contents.html'),
                 ['/foo/bar/contents.html', '/foo/baz/'])
 
+    def test_list_folder_contents_cache(self):
+        """The contents of a folder must only be requested once as long
+        as they are in the cache
+        """
+        with mock.patch('geospaas_harvesting.crawlers.Crawler._http_get') as mock_http_get:
+            mock_http_get.return_value.text = '<html><a href="baz.nc">baz</a><html/>'
+            mock_http_get.return_value.headers = {}
+            crawler = crawlers.HTMLDirectoryCrawler('http://foo')
+            for _ in range(2):
+                self.assertListEqual(crawler._list_folder_contents('/bar/'), ['/bar/baz.nc'])
+            mock_http_get.assert_called_once()
+
+            # the cache is separate for each crawler
+            crawlers.HTMLDirectoryCrawler('http://foo')._list_folder_contents('/bar/')
+            self.assertEqual(mock_http_get.call_count, 2)
+
+            # expired entries are requested again
+            with mock.patch('time.monotonic', return_value=time.monotonic() + 301):
+                crawler._list_folder_contents('/bar/')
+            self.assertEqual(mock_http_get.call_count, 3)
+
+    def test_list_folder_contents_cache_disabled(self):
+        """The contents of a folder must be requested every time if
+        LISTING_CACHE_TTL is 0
+        """
+        class NoCacheCrawler(crawlers.HTMLDirectoryCrawler):
+            """Crawler class without listing cache"""
+            LISTING_CACHE_TTL = 0
+
+        with mock.patch('geospaas_harvesting.crawlers.Crawler._http_get') as mock_http_get:
+            mock_http_get.return_value.text = '<html><a href="baz.nc">baz</a><html/>'
+            mock_http_get.return_value.headers = {}
+            crawler = NoCacheCrawler('http://foo')
+            for _ in range(2):
+                self.assertListEqual(crawler._list_folder_contents('/bar/'), ['/bar/baz.nc'])
+            self.assertEqual(mock_http_get.call_count, 2)
+            self.assertEqual(len(crawler._listing_cache), 0)
+
+    def test_list_folder_contents_conditional_request(self):
+        """Cached folder contents should be revalidated using the
+        ETag and Last-Modified headers sent by the server
+        """
+        with mock.patch('geospaas_harvesting.crawlers.Crawler._http_get') as mock_http_get:
+            mock_http_get.return_value.text = '<html><a href="baz.nc">baz</a><html/>'
+            mock_http_get.return_value.headers = {
+                'ETag': '"abc"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+            crawler = crawlers.HTMLDirectoryCrawler('http://foo')
+            self.assertListEqual(crawler._list_folder_contents('/bar/'), ['/bar/baz.nc'])
+            mock_http_get.assert_called_with('http://foo/bar/', request_parameters={},
+                                             max_tries=5, wait_time=5)
+
+            mock_http_get.return_value.status_code = 304
+            mock_http_get.return_value.text = ''
+            self.assertListEqual(crawler._list_folder_contents('/bar/'), ['/bar/baz.nc'])
+            mock_http_get.assert_called_with(
+                'http://foo/bar/',
+                request_parameters={'headers': {
+                    'If-None-Match': '"abc"',
+                    'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'}},
+                max_tries=5, wait_time=5)
+
+            # the validators expire with the contents
+            with mock.patch('time.monotonic', return_value=time.monotonic() + 301):
+                crawler._list_folder_contents('/bar/')
+            mock_http_get.assert_called_with('http://foo/bar/', request_parameters={},
+                                             max_tries=5, wait_time=5)
+            self.assertEqual(mock_http_get.call_count, 3)
+
+    def test_list_folder_contents_modified(self):
+        """The folder contents should be updated if the server does not
+        answer a conditional request with 304
+        """
+        with mock.patch('geospaas_harvesting.crawlers.Crawler._http_get') as mock_http_get:
+            mock_http_get.return_value.status_code = 200
+            mock_http_get.return_value.text = '<html><a href="baz.nc">baz</a><html/>'
+            mock_http_get.return_value.headers = {'ETag': '"abc"'}
+            crawler = crawlers.HTMLDirectoryCrawler('http://foo')
+            crawler._list_folder_contents('/bar/')
+
+            mock_http_get.return_value.text = '<html><a href="qux.nc">qux</a><html/>'
+            mock_http_get.return_value.headers = {'ETag': '"def"'}
+            self.assertListEqual(crawler._list_folder_contents('/bar/'), ['/bar/qux.nc'])
+            self.assertEqual(crawler._listing_cache.get('http://foo/bar/'),
+                             ('"def"', None, ('/bar/qux.nc',)))
+
+    def test_list_folder_contents_no_validators(self):
+        """No conditional request should be sent if the server did not
+        provide an ETag or Last-Modified header
+        """
+        with mock.patch('geospaas_harvesting.crawlers.Crawler._http_get') as mock_http_get:
+            mock_http_get.return_value.text = '<html><a href="baz.nc">baz</a><html/>'
+            mock_http_get.return_value.headers = {}
+            crawler = crawlers.HTMLDirectoryCrawler('http://foo')
+            crawler._list_folder_contents('/bar/')
+            with mock.patch('time.monotonic', return_value=time.monotonic() + 301):
+                crawler._list_folder_contents('/bar/')
+            self.assertListEqual(
+                mock_http_get.call_args_list,
+                [mock.call('http://foo/bar/', request_parameters={}, max_tries=5, wait_time=5)] * 2)
+
     def test_list_folder_contents_no_auth(self):
         """If no username and password are provided, HTTP requests
         should not have an 'auth' parameter
@@ -1107,6 +1666,21 @@ class ThreddsCrawlerTestCase(unittest.TestCase):
         mock_get_link.return_value = ['/thredds/dodsC/osisaf/met.no/ice_conc201911301200.nc.dods']
         self.assertIsNone(crawlers.ThreddsCrawler('').get_download_url("dummy"))
 
+    def test_add_url_to_return_once_per_page(self):
+        """The download URL of a dataset page must only be looked for
+        once
+        """
+        crawler = crawlers.ThreddsCrawler('https://foo/thredds/catalog.html')
+        with mock.patch.object(crawler, 'get_download_url',
+                               return_value='https://foo/thredds/fileServer/bar.nc') as mock_get_url:
+            crawler._add_url_to_return('/thredds/catalog.html?dataset=bar.nc')
+            crawler._add_url_to_return('/thredds/catalog.html?dataset=bar.nc')
+            crawler.set_initial_state()
+            crawler._add_url_to_return('/thredds/catalog.html?dataset=bar.nc')
+        self.assertEqual(mock_get_url.call_count, 2)
+        self.assertListEqual(crawler._results,
+                             [crawlers.DatasetInfo('https://foo/thredds/fileServer/bar.nc')])
+
     def test_get_ddx_url(self):
         """Test utility function which transforms download links into
         metadata links for Thredds
@@ -1205,10 +1779,140 @@ class HTTPPaginatedAPICrawlerTestCase(unittest.TestCase):
                 mock.patch.object(crawler, '_get_next_page'):
             self.assertListEqual(list(crawler.crawl()), [crawlers.DatasetInfo('bar')])
 
+    def test_crawl_prefetch(self):
+        """The next page must be downloaded while the results of the
+        current one are processed
+        """
+        crawler = crawlers.HTTPPaginatedAPICrawler('https://foo')
+        pages = ['page1', 'page2', 'empty']
+        second_page_requested = threading.Event()
+
+        def get_page(request_parameters):
+            page = pages.pop(0)
+            if page == 'page2':
+                second_page_requested.set()
+            return page
+
+        def get_datasets_info(page):
+            if page == 'empty':
+                return False
+            crawler._results.append(crawlers.DatasetInfo(page))
+            return True
+
+        with mock.patch.object(crawler, '_get_page', side_effect=get_page), \
+                mock.patch.object(crawler, '_get_datasets_info', side_effect=get_datasets_info):
+            crawl = crawler.crawl()
+            self.assertEqual(next(crawl), crawlers.DatasetInfo('page1'))
+            # page2 is requested while the results of page1 are processed
+            self.assertTrue(second_page_requested.wait(5))
+            self.assertListEqual(list(crawl), [crawlers.DatasetInfo('page2')])
+
+    def test_crawl_number_of_requests(self):
+        """For a 2 pages result set, only the two pages and the empty
+        page after them must be requested
+        """
+        crawler = crawlers.HTTPPaginatedAPICrawler('https://foo')
+        responses = iter(['page1', 'page2', 'empty'])
+
+        def http_get(url, request_parameters):
+            return mock.Mock(text=next(responses))
+
+        def get_datasets_info(page):
+            if page == 'empty':
+                return False
+            crawler._results.append(crawlers.DatasetInfo(page))
+            return True
+
+        with mock.patch.object(crawler, '_http_get', side_effect=http_get) as mock_http_get, \
+                mock.patch.object(crawler, '_get_datasets_info', side_effect=get_datasets_info):
+            self.assertListEqual(
+                list(crawler.crawl()),
+                [crawlers.DatasetInfo('page1'), crawlers.DatasetInfo('page2')])
+        self.assertEqual(mock_http_get.call_count, 3)
+
+    def test_crawl_stopped_early(self):
+        """When the iteration is stopped, the crawler must not wait for
+        the prefetched page
+        """
+        crawler = crawlers.HTTPPaginatedAPICrawler('https://foo')
+        release = threading.Event()
+
+        def get_page(request_parameters):
+            if crawler._get_page.call_count > 1:
+                release.wait(5)
+            return 'page'
+
+        def get_datasets_info(page):
+            crawler._results.append(crawlers.DatasetInfo(page))
+            return True
+
+        with mock.patch.object(crawler, '_get_page', side_effect=get_page), \
+                mock.patch.object(crawler, '_get_datasets_info', side_effect=get_datasets_info):
+            crawl = crawler.crawl()
+            next(crawl)
+            start = time.monotonic()
+            crawl.close()
+            self.assertLess(time.monotonic() - start, 1)
+            release.set()
+
+    def test_crawl_stopped_early_offset(self):
+        """A prefetch which is still running when the iteration is
+        stopped must not change the offset of the crawler
+        """
+        crawler = crawlers.HTTPPaginatedAPICrawler('https://foo')
+        prefetch_started = threading.Event()
+        release = threading.Event()
+        requested_offsets = []
+
+        def http_get(url, request_parameters):
+            requested_offsets.append(request_parameters['params'][crawler.PAGE_OFFSET_NAME])
+            if len(requested_offsets) == 2:
+                prefetch_started.set()
+                release.wait(5)
+            return mock.Mock(text='page')
+
+        def get_datasets_info(page):
+            crawler._results.append(crawlers.DatasetInfo(page))
+            return True
+
+        with mock.patch.object(crawler, '_http_get', side_effect=http_get) as mock_http_get, \
+                mock.patch.object(crawler, '_get_datasets_info', side_effect=get_datasets_info):
+            crawl = crawler.crawl()
+            next(crawl)
+            self.assertTrue(prefetch_started.wait(5))
+            crawl.close()
+            release.set()
+            # wait for the orphaned prefetch to finish
+            for thread in threading.enumerate():
+                if thread.name.startswith('HTTPPaginatedAPICrawler'):
+                    thread.join(5)
+            self.assertEqual(crawler.page_offset, 1)
+
+            crawler.set_initial_state()
+            crawl = crawler.crawl()
+            next(crawl)
+            crawl.close()
+            self.assertEqual(crawler.page_offset, 1)
+        self.assertListEqual(requested_offsets[:3], [0, 1, 0])
+        self.assertGreaterEqual(mock_http_get.call_count, 3)
+
+    def test_crawl_prefetch_error(self):
+        """Errors which happen when getting a needed page must be
+        raised
+        """
+        crawler = crawlers.HTTPPaginatedAPICrawler('https://foo')
+        with mock.patch.object(crawler, '_get_next_page', side_effect=RuntimeError), \
+                mock.patch.object(crawler, '_get_datasets_info', return_value=False):
+            with self.assertRaises(RuntimeError):
+                list(crawler.crawl())
+
 
 class FTPCrawlerTestCase(unittest.TestCase):
     """Tests for the FTP crawler"""
 
+    def setUp(self):
+        crawlers.FTPCrawler._no_mlsd_hosts.clear()
+
     def emulate_cwd_of_ftp(self, name):
         """passes in the case of "", ".." or "folder_name" in order to resemble the behavior of cwd
         of ftplib. Otherwise (encountering a filename) raise the proper exception """
@@ -1220,6 +1924,7 @@ class FTPCrawlerTestCase(unittest.TestCase):
         """check that file URLs and folders paths are added to the right stacks"""
 
         test_crawler = crawlers.FTPCrawler('ftp://foo', include='\.gz$')
+        test_crawler.ftp.mlsd.side_effect = ftplib.error_perm('500 Unknown command')
         test_crawler.ftp.nlst.return_value = ['file1.gz', 'folder_name', 'file3.bb', 'file2.gz', ]
         test_crawler.ftp.cwd = self.emulate_cwd_of_ftp
         test_crawler.ftp.host = ''
@@ -1236,6 +1941,143 @@ class FTPCrawlerTestCase(unittest.TestCase):
         # folder with 'folder_name' must be in the "_to_process" list
         self.assertCountEqual(['/', 'folder_name'], test_crawler._to_process)
 
+    @mock.patch('ftplib.FTP', autospec=True)
+    def test_ftp_navigation_mlsd(self, mock_ftp):
+        """When the server supports MLSD, the folders must be found
+        without changing the working directory
+        """
+        test_crawler = crawlers.FTPCrawler('ftp://foo', include='\.gz$')
+        test_crawler.ftp.mlsd.return_value = iter([
+            ('.', {'type': 'cdir'}),
+            ('..', {'type': 'pdir'}),
+            ('file1.gz', {'type': 'file'}),
+            ('folder_name', {'type': 'dir'}),
+            ('file3.bb', {'type': 'file'}),
+        ])
+        test_crawler.ftp.host = ''
+        test_crawler._process_folder('/bar')
+        self.assertEqual(test_crawler._results, [crawlers.DatasetInfo('ftp://foo/bar/file1.gz')])
+        self.assertCountEqual(['/', '/bar/folder_name'], test_crawler._to_process)
+        test_crawler.ftp.cwd.assert_not_called()
+        test_crawler.ftp.nlst.assert_not_called()
+
+    @mock.patch('ftplib.FTP', autospec=True)
+    def test_mlsd_not_supported(self, mock_ftp):
+        """If the server does not support MLSD, NLST must be used
+        without trying MLSD again
+        """
+        test_crawler = crawlers.FTPCrawler('ftp://foo')
+        test_crawler.ftp.mlsd.side_effect = ftplib.error_perm('502 Command not implemented')
+        test_crawler.ftp.nlst.return_value = ['/foo']
+        self.assertListEqual(test_crawler._list_folder_contents('/'), ['/foo'])
+        self.assertListEqual(test_crawler._list_folder_contents('/'), ['/foo'])
+        # the capability is remembered for other crawlers on the same host
+        self.assertListEqual(
+            crawlers.FTPCrawler('ftp://foo/bar')._list_folder_contents('/'), ['/foo'])
+        test_crawler.ftp.mlsd.assert_called_once()
+
+    @mock.patch('ftplib.FTP', autospec=True)
+    def test_ftp_navigation_list(self, mock_ftp):
+        """When the server does not support MLSD, the output of LIST
+        must be used to find the folders
+        """
+        test_crawler = crawlers.FTPCrawler('ftp://foo', include='\.gz$')
+        test_crawler.ftp.mlsd.side_effect = ftplib.error_perm('500 Unknown command')
+        test_crawler.ftp.retrlines.side_effect = lambda command, callback: [
+            callback(line) for line in (
+                'total 3',
+                'drwxr-xr-x   2 ftp ftp 4096 Jan 01 12:00 .',
+                'drwxr-xr-x   2 ftp ftp 4096 Jan 01 12:00 ..',
+                '-rw-r--r--   1 ftp ftp 1234 Mar  5  2019 file1.gz',
+                'drwxr-xr-x   2 ftp ftp 4096 Jan 01 12:00 folder_name',
+                '-rw-r--r--   1 ftp ftp 1234 Mar  5  2019 file3.bb')]
+        test_crawler.ftp.host = ''
+        test_crawler._process_folder('/bar')
+        test_crawler.ftp.retrlines.assert_called_once_with('LIST /bar', mock.ANY)
+        self.assertEqual(test_crawler._results, [crawlers.DatasetInfo('ftp://foo/bar/file1.gz')])
+        self.assertCountEqual(['/', '/bar/folder_name'], test_crawler._to_process)
+        test_crawler.ftp.cwd.assert_not_called()
+        test_crawler.ftp.nlst.assert_not_called()
+
+    @mock.patch('ftplib.FTP', autospec=True)
+    def test_list_unknown_format(self, mock_ftp):
+        """If the output of LIST can't be parsed, NLST must be used"""
+        test_crawler = crawlers.FTPCrawler('ftp://foo')
+        test_crawler.ftp.mlsd.side_effect = ftplib.error_perm('500 Unknown command')
+        test_crawler.ftp.retrlines.side_effect = lambda command, callback: callback('foo bar')
+        test_crawler.ftp.nlst.return_value = ['/foo']
+        self.assertListEqual(test_crawler._list_folder_contents('/'), ['/foo'])
+
+    def test_parse_list_line(self):
+        """Test parsing UNIX and Windows LIST formats"""
+        self.assertEqual(
+            crawlers.FTPCrawler._parse_list_line(
+                'drwxr-xr-x    2 ftp      ftp          4096 Jan 01 12:00 folder name'),
+            ('folder name', {'type': 'dir'}))
+        self.assertEqual(
+            crawlers.FTPCrawler._parse_list_line('-rw-r--r--   1 owner 123456 Mar  5  2019 a.nc'),
+            ('a.nc', {'type': 'file'}))
+        self.assertEqual(
+            crawlers.FTPCrawler._parse_list_line(
+                'lrwxrwxrwx   1 0 0 9 Mar  5 2019 latest -> 2019/03'),
+            ('latest', {'type': ''}))
+        self.assertEqual(
+            crawlers.FTPCrawler._parse_list_line('01-01-20  12:00PM       <DIR>          some dir'),
+            ('some dir', {'type': 'dir'}))
+        self.assertEqual(
+            crawlers.FTPCrawler._parse_list_line('01-01-2020  12:00       1234 a.nc'),
+            ('a.nc', {'type': 'file'}))
+        self.assertIsNone(crawlers.FTPCrawler._parse_list_line('foo bar'))
+
+    @mock.patch('ftplib.FTP', autospec=True)
+    def test_is_folder_files_suffixes(self, mock_ftp):
+        """Paths ending with a known file suffix must not be checked on
+        the server
+        """
+        test_crawler = crawlers.FTPCrawler('ftp://foo')
+        self.assertFalse(test_crawler._is_folder('/bar/baz.nc'))
+        test_crawler.ftp.cwd.assert_not_called()
+        self.assertTrue(test_crawler._is_folder('/bar/baz'))
+        test_crawler.ftp.cwd.assert_called_once_with('/bar/baz')
+
+    @mock.patch('ftplib.FTP', autospec=True)
+    def test_mlsd_file_path(self, mock_ftp):
+        """If MLSD fails because the path is a file, NLST must be used
+        for this path only
+        """
+        test_crawler = crawlers.FTPCrawler('ftp://foo')
+        test_crawler.ftp.mlsd.side_effect = ftplib.error_perm('501 Not a directory')
+        test_crawler.ftp.nlst.return_value = ['/foo.nc']
+        self.assertListEqual(test_crawler._list_folder_contents('/foo.nc'), ['/foo.nc'])
+        self.assertNotIn('foo', crawlers.FTPCrawler._no_mlsd_hosts)
+
+    def test_crawl_in_threads(self):
+        """When max_threads is greater than 1, each folder processing
+        thread must use its own connection, which is closed at the end
+        """
+        connections = []
+
+        def create_connection(*args, **kwargs):
+            connection = mock.Mock()
+            connection.mlsd.side_effect = lambda path, facts: iter(
+                [('foo', {'type': 'dir'}), ('bar.nc', {'type': 'file'})]
+                if path == '/' else [('baz.nc', {'type': 'file'})])
+            connections.append(connection)
+            return connection
+
+        with mock.patch('ftplib.FTP', side_effect=create_connection):
+            crawler = crawlers.FTPCrawler('ftp://host', include=r'\.nc$', max_threads=2)
+            results = list(crawler.crawl())
+
+        self.assertCountEqual(
+            results,
+            [crawlers.DatasetInfo('ftp://host/bar.nc'), crawlers.DatasetInfo('ftp://host/foo/baz.nc')])
+        # the crawler's own connection is not used to list folders
+        connections[0].mlsd.assert_not_called()
+        self.assertGreater(len(connections), 1)
+        for connection in connections[1:]:
+            connection.close.assert_called_once_with()
+
     @mock.patch('geospaas_harvesting.crawlers.ftplib.FTP.login')
     def test_ftp_correct_exception(self, mock_ftp):
         """set_initial_state() should not raise an error in case of
@@ -1269,7 +2111,7 @@ class FTPCrawlerTestCase(unittest.TestCase):
         """
         with mock.patch('ftplib.FTP'):
             crawler = crawlers.FTPCrawler('ftp://foo')
-            crawler.ftp.nlst.side_effect = ftplib.error_temp('421')
+            crawler.ftp.mlsd.side_effect = ftplib.error_temp('421')
 
             with self.assertRaises(ftplib.error_temp), \
                  self.assertLogs(crawler.logger, level=logging.INFO) as log_cm:
@@ -1286,7 +2128,7 @@ class FTPCrawlerTestCase(unittest.TestCase):
             crawler = crawlers.FTPCrawler('ftp://foo')
 
             for error in (ConnectionError, ConnectionRefusedError, ConnectionResetError):
-                crawler.ftp.nlst.side_effect = error
+                crawler.ftp.mlsd.side_effect = error
 
                 with mock.patch.object(crawler, 'connect') as mock_connect:
                     with self.assertRaises(error), \
@@ -1298,7 +2140,7 @@ class FTPCrawlerTestCase(unittest.TestCase):
         """FTP errors other than timeouts should not trigger a retry"""
         with mock.patch('ftplib.FTP'):
             crawler = crawlers.FTPCrawler('ftp://foo')
-            crawler.ftp.nlst.side_effect = ftplib.error_temp('422')
+            crawler.ftp.mlsd.side_effect = ftplib.error_temp('422')
 
             with mock.patch.object(crawler, 'connect') as mock_connect:
                 with self.assertRaises(ftplib.error_temp):
@@ -1311,7 +2153,10 @@ class FTPCrawlerTestCase(unittest.TestCase):
             crawler = crawlers.FTPCrawler('ftp://foo/bar')
         expected_result = crawler.__dict__.copy()
         expected_result['ftp'] = None
+        del expected_result['_thread_connections']
         self.assertDictEqual(crawler.__getstate__(), expected_result)
+        # the crawler's own connection is kept
+        self.assertIsNotNone(crawler.ftp)
 
     def test_setstate(self):
         """Test unpickling an FTPCrawler"""
@@ -1334,6 +2179,8 @@ class FTPCrawlerTestCase(unittest.TestCase):
             crawler.__setstate__(state)
         expected_result = state.copy()
         expected_result['ftp'] = ftp_mock
+        self.assertIsInstance(crawler._thread_connections, threading.local)
+        expected_result['_thread_connections'] = crawler._thread_connections
         self.assertDictEqual(crawler.__dict__, expected_result)
 
     def test_get_normalized_attributes(self):
@@ -0,0 +1,105 @@
+"""Tests for the geospaas_harvesting package initialization"""
+import importlib
+import json
+import logging
+import os
+import os.path
+import tempfile
+import unittest
+import unittest.mock as mock
+
+import geospaas_harvesting
+
+
+class LoggingConfigurationTestCase(unittest.TestCase):
+    """Tests for the logging configuration loading"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.temp_dir.name, 'logging.yml')
+        with open(self.config_path, 'w', encoding='utf-8') as config_file:
+            config_file.write("---\nversion: 1\n")
+        cache_dir_patcher = mock.patch('geospaas_harvesting.utils.CACHE_DIR',
+                                       os.path.join(self.temp_dir.name, 'cache'))
+        cache_dir_patcher.start()
+        self.addCleanup(cache_dir_patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_logging_configuration_creates_cache(self):
+        """The parsed configuration should be written to the cache
+        directory
+        """
+        self.assertDictEqual(
+            geospaas_harvesting._read_logging_configuration(self.config_path),  # pylint: disable=protected-access
+            {'version': 1})
+        cache_files = os.listdir(geospaas_harvesting.utils.CACHE_DIR)
+        self.assertEqual(len(cache_files), 1)
+        with open(os.path.join(geospaas_harvesting.utils.CACHE_DIR, cache_files[0]),
+                  encoding='utf-8') as cache_file:
+            self.assertEqual(json.load(cache_file)['data'], {'version': 1})
+
+    def test_read_logging_configuration_uses_cache(self):
+        """The YAML file should not be parsed again if a cached version
+        is available
+        """
+        geospaas_harvesting._read_logging_configuration(self.config_path)  # pylint: disable=protected-access
+        with mock.patch('yaml.load') as mock_load:
+            self.assertDictEqual(
+                geospaas_harvesting._read_logging_configuration(self.config_path),  # pylint: disable=protected-access
+                {'version': 1})
+        mock_load.assert_not_called()
+
+    def test_read_logging_configuration_invalidated_cache(self):
+        """The YAML file should be parsed again if it was modified"""
+        geospaas_harvesting._read_logging_configuration(self.config_path)  # pylint: disable=protected-access
+        with open(self.config_path, 'w', encoding='utf-8') as config_file:
+            config_file.write("---\nversion: 1\ndisable_existing_loggers: false\n")
+        self.assertDictEqual(
+            geospaas_harvesting._read_logging_configuration(self.config_path),  # pylint: disable=protected-access
+            {'version': 1, 'disable_existing_loggers': False})
+
+    def test_read_logging_configuration_single_cache_file(self):
+        """Modifying the configuration should replace the cache file
+        instead of adding a new one
+        """
+        geospaas_harvesting._read_logging_configuration(self.config_path)  # pylint: disable=protected-access
+        with open(self.config_path, 'a', encoding='utf-8') as config_file:
+            config_file.write("disable_existing_loggers: false\n")
+        geospaas_harvesting._read_logging_configuration(self.config_path)  # pylint: disable=protected-access
+        self.assertEqual(len(os.listdir(geospaas_harvesting.utils.CACHE_DIR)), 1)
+
+    def test_read_logging_configuration_same_mtime(self):
+        """The cache should not be used if the size of the file changed,
+        even if its modification time is the same
+        """
+        geospaas_harvesting._read_logging_configuration(self.config_path)  # pylint: disable=protected-access
+        mtime_ns = os.stat(self.config_path).st_mtime_ns
+        with open(self.config_path, 'w', encoding='utf-8') as config_file:
+            config_file.write("---\nversion: 2\n\n")
+        os.utime(self.config_path, ns=(mtime_ns, mtime_ns))
+        self.assertDictEqual(
+            geospaas_harvesting._read_logging_configuration(self.config_path),  # pylint: disable=protected-access
+            {'version': 2})
+
+    def test_read_logging_configuration_write_error(self):
+        """The temporary file should be removed if the cache can't be
+        written
+        """
+        with mock.patch('os.replace', side_effect=OSError):
+            self.assertDictEqual(
+                geospaas_harvesting._read_logging_configuration(self.config_path),  # pylint: disable=protected-access
+                {'version': 1})
+        self.assertListEqual(os.listdir(geospaas_harvesting.utils.CACHE_DIR), [])
+
+
+class ConfigureLoggingTestCase(unittest.TestCase):
+    """Tests for the logging configuration step"""
+
+    def test_logging_configured_only_once(self):
+        """Reloading the package should not configure logging again"""
+        self.assertTrue(getattr(logging, '_geospaas_harvesting_configured', False))
+        with mock.patch('logging.config.dictConfig') as mock_dict_config:
+            importlib.reload(geospaas_harvesting)
+        mock_dict_config.assert_not_called()
@@ -1,5 +1,6 @@
 """Tests for the recovery module"""
 import logging
+import pickle
 import tempfile
 import unittest.mock as mock
 from datetime import datetime
@@ -57,6 +58,24 @@ class IngestionRecoveryTestCase(django.test.TestCase):
                                              for i in range(2)])
         self.assertFalse(recovery_file.exists())
 
+    def test_ingest_file_one_tuple_per_pickle(self):
+        """Test ingesting a recovery file in which each tuple is
+        pickled separately
+        """
+        recovery_file = Path(self.tmp_dir.name, f"foo_{crawlers.CrawlerIterator.RECOVERY_SUFFIX}")
+        with open(recovery_file, 'wb') as pickle_file:
+            for i in range(2):
+                pickle.dump((crawlers.DatasetInfo(f'http://foo{i}'),
+                             requests.ConnectionError(f'bar{i}')),
+                            pickle_file)
+
+        with mock.patch('geospaas_harvesting.ingesters.Ingester.ingest') as mock_ingest:
+            with self.assertLogs(recovery.logger, level=logging.INFO):
+                recovery.ingest_file(recovery_file)
+
+        mock_ingest.assert_called_once_with([crawlers.DatasetInfo(f'http://foo{i}')
+                                             for i in range(2)])
+
     def test_ingest_file_nothing_to_ingest(self):
         """Test that no ingestion is triggered if the pickled exception
         are not of the supported types
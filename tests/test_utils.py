@@ -1,6 +1,7 @@
 """Tests for the geospaas_harvesting.utils module"""
 import io
 import os.path
+import pickle
 import unittest
 import unittest.mock as mock
 import xml.etree.ElementTree as ET
@@ -52,6 +53,16 @@ class UtilsTestCase(unittest.TestCase):
             )
             mock_request.assert_called_once_with('GET', 'url', stream=True)
 
+    def test_http_request_with_session(self):
+        """If a session is provided, the request should be sent
+        through it
+        """
+        session = mock.Mock()
+        self.assertEqual(
+            utils.http_request('GET', 'url', session=session, auth=('username', 'password')),
+            session.request.return_value)
+        session.request.assert_called_once_with('GET', 'url', auth=('username', 'password'))
+
     def test_yaml_parsing(self):
         """Test YAML parsing with environment variable retrieval"""
         yaml_content="""---
@@ -65,6 +76,21 @@ class UtilsTestCase(unittest.TestCase):
                 utils.read_yaml_file(''),
                 {'foo': 'bar', 'baz': 'qux'})
 
+    def test_raw_yaml_parsing(self):
+        """The !ENV tags should be kept as is when reading raw YAML,
+        and resolved by resolve_env_tags()
+        """
+        yaml_content = """---
+        foo: [bar]
+        baz: !ENV ENV_VAR
+        """
+        with mock.patch('builtins.open', return_value=io.StringIO(yaml_content)):
+            raw_data = utils.read_raw_yaml_file('')
+        self.assertDictEqual(raw_data, {'foo': ['bar'], 'baz': {'!ENV': 'ENV_VAR'}})
+        with mock.patch('os.environ', {'ENV_VAR': 'qux'}):
+            self.assertDictEqual(utils.resolve_env_tags(raw_data),
+                                 {'foo': ['bar'], 'baz': 'qux'})
+
     def test_xml_parsing(self):
         """Test XML parsing and namespaces extraction"""
         xml = b"""<?xml version="1.0" encoding="UTF-8"?>
@@ -93,3 +119,38 @@ class UtilsTestCase(unittest.TestCase):
         xml_file = io.BytesIO(xml)
         with self.assertRaises(KeyError):
             _, _ = utils.parse_xml_get_ns(xml_file)
+
+    def test_ttl_cache(self):
+        """TTLCache must return the values which have not expired and
+        keep at most `maxsize` entries
+        """
+        cache = utils.TTLCache(maxsize=2, ttl=10)
+        with mock.patch('time.monotonic', return_value=0):
+            cache['foo'] = 1
+            cache['bar'] = 2
+            self.assertEqual(cache.get('foo'), 1)
+            # 'bar' is the least recently used entry
+            cache['baz'] = 3
+            self.assertIsNone(cache.get('bar'))
+            self.assertEqual(len(cache), 2)
+        with mock.patch('time.monotonic', return_value=10):
+            self.assertEqual(cache.get('foo', 'default'), 'default')
+            self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_ttl_cache_disabled(self):
+        """TTLCache must not keep anything if `ttl` is 0"""
+        cache = utils.TTLCache(maxsize=2, ttl=0)
+        cache['foo'] = 1
+        self.assertIsNone(cache.get('foo'))
+        self.assertEqual(len(cache), 0)
+
+    def test_ttl_cache_pickle(self):
+        """TTLCache must be picklable"""
+        cache = utils.TTLCache(maxsize=2, ttl=10)
+        cache['foo'] = 1
+        unpickled_cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(unpickled_cache.get('foo'), 1)
+        unpickled_cache['bar'] = 2
+        self.assertEqual(len(unpickled_cache), 2)